@@ -0,0 +1,205 @@
+"""Асинхронные версии частых GET-запросов API для работы под ASGI.
+
+Условный GET по версиям отвечает 304 прямо в цикле событий, а тело
+строят методы тех же viewset за один переход в синхронный поток. Под
+ASGI это быстрее, чем синхронные view: benchmarks/async_reads сравнивает
+оба варианта. Остальные методы передаются viewset целиком.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+from rest_framework import exceptions
+from rest_framework.mixins import ListModelMixin, RetrieveModelMixin
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from foodgram.replicas import primary_reads
+
+from .authentication import CachedTokenAuthentication
+from .cache import aget_versions, versions_etag
+from .ingredient_index import ingredient_index
+from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
+                    TagViewSet, recipe_versions)
+
+renderer = JSONRenderer()
+authentication = CachedTokenAuthentication()
+
+
+def render(data, status=200):
+    return HttpResponse(
+        renderer.render(data), content_type="application/json", status=status
+    )
+
+
+def render_response(response):
+    """HttpResponse из Response DRF с его статусом и заголовками."""
+    rendered = render(response.data, response.status_code)
+    for header, value in response.items():
+        if header.lower() != "content-type":
+            rendered[header] = value
+    return rendered
+
+
+async def authenticate(request):
+    """Пользователь по заголовку Authorization, как у синхронных view."""
+    result = await sync_to_async(authentication.authenticate)(request)
+    return AnonymousUser() if result is None else result[0]
+
+
+def handle_exception(exc):
+    """Ответ на исключение, как у APIView.handle_exception."""
+    response = exception_handler(exc, {})
+    if response is None:
+        raise exc
+    if response.status_code == 401:
+        response["WWW-Authenticate"] = authentication.authenticate_header(None)
+    return render_response(response)
+
+
+def async_read(viewset, actions):
+    """GET обрабатывает асинхронная функция, остальное - viewset DRF.
+
+    Функция может вернуть None, чтобы тоже передать запрос viewset.
+    """
+    sync_view = sync_to_async(viewset.as_view(actions))
+
+    def decorator(handler):
+        @wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method != "GET":
+                return await sync_view(request, *args, **kwargs)
+            try:
+                request.user = await authenticate(request)
+                response = await handler(request, *args, **kwargs)
+            except Exception as exc:
+                response = handle_exception(exc)
+            if response is None:
+                return await sync_view(request, *args, **kwargs)
+            return response
+
+        view.csrf_exempt = True
+        view.cls, view.actions = viewset, actions
+        return view
+
+    return decorator
+
+
+def versioned(get_names):
+    """Условный GET по версиям ресурсов, как api.views.versioned.
+
+    Версии читаются из кэша асинхронно, поэтому 304 не занимает поток.
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        async def inner(request, *args, **kwargs):
+            versions = await aget_versions(*get_names(request, **kwargs))
+            etag = quote_etag(versions_etag(versions))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                with primary_reads():
+                    response = await handler(request, *args, **kwargs)
+            response.headers.setdefault("ETag", etag)
+            return response
+
+        return inner
+
+    return decorator
+
+
+async def respond(viewset, request, action, method, **kwargs):
+    """Ответ метода viewset, построенный в синхронном потоке.
+
+    method — метод без условного GET: его уже выполнил versioned.
+    """
+    drf_request = Request(request)
+    drf_request.user = request.user
+    view = viewset(
+        request=drf_request,
+        action=action,
+        args=(),
+        kwargs=kwargs,
+        format_kwarg=None,
+    )
+    return render_response(
+        await sync_to_async(method)(view, drf_request, **kwargs)
+    )
+
+
+@async_read(RecipeViewSet, {"get": "list", "post": "create"})
+async def recipe_list(request):
+    if request.GET.get("pagination") == "cursor":
+        return None
+    return await respond(RecipeViewSet, request, "list", ListModelMixin.list)
+
+
+@async_read(
+    RecipeViewSet,
+    {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    },
+)
+@versioned(recipe_versions)
+async def recipe_detail(request, pk):
+    response = await respond(
+        RecipeViewSet, request, "retrieve", RetrieveModelMixin.retrieve, pk=pk
+    )
+    patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+@async_read(TagViewSet, {"get": "list"})
+@versioned(lambda request, **kwargs: ("tags",))
+async def tag_list(request):
+    return await respond(TagViewSet, request, "list", ListModelMixin.list)
+
+
+@async_read(TagViewSet, {"get": "retrieve"})
+@versioned(lambda request, **kwargs: ("tags",))
+async def tag_detail(request, pk):
+    return await respond(
+        TagViewSet, request, "retrieve", RetrieveModelMixin.retrieve, pk=pk
+    )
+
+
+@async_read(IngredientViewSet, {"get": "list"})
+@versioned(lambda request, **kwargs: ("ingredients",))
+async def ingredient_list(request):
+    name = request.GET.get("name")
+    if name:
+        return render(await sync_to_async(ingredient_index.search)(name))
+    return await respond(
+        IngredientViewSet, request, "list", ListModelMixin.list
+    )
+
+
+@async_read(IngredientViewSet, {"get": "retrieve"})
+@versioned(lambda request, **kwargs: ("ingredients",))
+async def ingredient_detail(request, pk):
+    return await respond(
+        IngredientViewSet,
+        request,
+        "retrieve",
+        RetrieveModelMixin.retrieve,
+        pk=pk,
+    )
+
+
+@async_read(CustomUserViewSet, {"get": "subscriptions"})
+async def subscriptions(request):
+    if not request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    return await respond(
+        CustomUserViewSet,
+        request,
+        "subscriptions",
+        CustomUserViewSet.subscriptions,
+    )
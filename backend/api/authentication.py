@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import token_cache
+
+User = get_user_model()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, который берет токен из кэша.
+
+    В кэше лежат только id и активность пользователя, поэтому пользователь
+    собирается с отложенными полями: они читаются из БД при первом
+    обращении. Записи удаляются сигналами из api.signals.
+    """
+
+    def authenticate_credentials(self, key):
+        data = token_cache.get(key)
+        if data is None:
+            model = self.get_model()
+            try:
+                token = model.objects.select_related("user").get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            data = {
+                "key": token.key,
+                "user_id": token.user_id,
+                "is_active": token.user.is_active,
+            }
+            token_cache.set(key, data)
+        if not data["is_active"]:
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted.")
+            )
+        user = User.from_db(
+            "default", ("id", "is_active"), (data["user_id"], True)
+        )
+        token = self.get_model().from_db(
+            "default", ("key", "user_id"), (data["key"], data["user_id"])
+        )
+        token.user = user
+        return (user, token)
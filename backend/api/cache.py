@@ -0,0 +1,115 @@
+from time import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from foodgram.metrics import count_cache
+
+VERSION_TIMEOUT = 7 * 24 * 60 * 60
+
+
+class SharedCache:
+    """Записи одного вида в кэше с учетом попаданий в метриках.
+
+    Хранилище берется из CACHES по псевдониму, поэтому в тестах и при
+    разработке это локальная память, а в продакшене — общий кэш.
+    """
+
+    key_prefix = None
+
+    def __init__(self, alias, timeout):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def make_key(self, key):
+        return f"{self.key_prefix}:{key}"
+
+    def get(self, key):
+        data = self.cache.get(self.make_key(key))
+        count_cache(self.key_prefix, data is not None, data is None)
+        return data
+
+    def get_many(self, keys):
+        keys = {self.make_key(key): key for key in keys}
+        found = {
+            keys[key]: data
+            for key, data in self.cache.get_many(keys).items()
+        }
+        count_cache(self.key_prefix, len(found), len(keys) - len(found))
+        return found
+
+    def set(self, key, data):
+        self.cache.set(self.make_key(key), data, self.timeout)
+
+    def invalidate(self, *keys):
+        self.cache.delete_many([self.make_key(key) for key in keys])
+
+
+class RecipeCache(SharedCache):
+    """Кэш карточек рецептов без полей, зависящих от пользователя."""
+
+    key_prefix = "recipe-card"
+
+
+recipe_cache = RecipeCache(
+    settings.RECIPE_CACHE_ALIAS, settings.RECIPE_CACHE_TIMEOUT
+)
+
+
+class TokenCache(SharedCache):
+    """Кэш токенов: ключ токена -> id и активность пользователя.
+
+    Остальные поля пользователя, в том числе хэш пароля, в кэш не
+    попадают. Записи живут недолго и удаляются сразу при выходе, смене
+    пароля и изменении пользователя, поэтому кэш должен быть общим для
+    всех процессов.
+    """
+
+    key_prefix = "auth-token"
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_ALIAS, settings.AUTH_TOKEN_CACHE_TIMEOUT
+)
+
+
+def version_key(name):
+    return f"version:{name}"
+
+
+def get_versions(*names):
+    """Версии ресурсов — время их последнего изменения в секундах."""
+    keys = [version_key(name) for name in names]
+    versions = cache.get_many(keys)
+    missing = {key: time() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, VERSION_TIMEOUT)
+        versions.update(cache.get_many(missing))
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(*names):
+    keys = [version_key(name) for name in names]
+    versions = await cache.aget_many(keys)
+    missing = {key: time() for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            await cache.aadd(key, version, VERSION_TIMEOUT)
+        versions.update(await cache.aget_many(missing))
+    return [versions[key] for key in keys]
+
+
+def bump_versions(*names):
+    now = time()
+    cache.set_many(
+        {version_key(name): now for name in names}, VERSION_TIMEOUT
+    )
+
+
+def versions_etag(versions):
+    return "-".join(f"{version:.6f}" for version in versions)
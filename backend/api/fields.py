@@ -0,0 +1,60 @@
+from rest_framework import serializers
+
+from recipes.images import ImageTooLarge, InvalidImage, check_base64_image
+
+IMAGE_TYPES = ("png", "jpeg", "jpg", "gif", "webp")
+
+
+class DeferredBase64ImageField(serializers.Field):
+    """Изображение в base64, которое декодируется вне запроса.
+
+    Поле проверяет data URI, размер и число пикселей по заголовку и
+    возвращает строку base64; нормализация выполняется в recipes.images.
+    """
+
+    default_error_messages = {
+        "invalid": "Загрузите корректное изображение в формате data URI",
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str) or not data.startswith("data:image/"):
+            self.fail("invalid")
+        header, separator, payload = data.partition(";base64,")
+        if not separator or header[len("data:image/"):] not in IMAGE_TYPES:
+            self.fail("invalid")
+        try:
+            check_base64_image(payload)
+        except InvalidImage:
+            self.fail("invalid")
+        except ImageTooLarge as error:
+            raise serializers.ValidationError(str(error))
+        return payload
+
+    def to_representation(self, value):
+        return value.url if value else None
+
+
+class PrimaryKeyListField(serializers.ListField):
+    """Список id объектов, проверяемый одним запросом к queryset."""
+
+    child = serializers.IntegerField()
+    default_error_messages = {
+        "does_not_exist": "Объектов с id = {pk_value} не существует",
+    }
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        ids = super().to_internal_value(data)
+        objects = self.queryset.in_bulk(ids)
+        missing = [pk for pk in dict.fromkeys(ids) if pk not in objects]
+        if missing:
+            self.fail(
+                "does_not_exist", pk_value=", ".join(map(str, missing))
+            )
+        return [objects[pk] for pk in ids]
+
+    def to_representation(self, value):
+        return [item.pk for item in value.all()]
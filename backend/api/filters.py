@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import SearchFilter
 
 from recipes.models import Ingredient, Recipe, Tag
 
@@ -43,3 +45,26 @@ class RecipesFilter(FilterSet):
         if value and user.is_authenticated:
             return queryset.filter(recipe_shopping_cart__user=user)
         return queryset
+
+
+class RecipeSearchFilter(SearchFilter):
+    """Полнотекстовый ?search= по рецептам, самые релевантные первыми.
+
+    Курсорная пагинация идет по (pub_date, id) и потеряла бы порядок по
+    релевантности, поэтому вместе с ней поиск не выполняется.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "").strip()
+        if not text:
+            return queryset
+        if request.query_params.get("pagination") == "cursor":
+            raise ValidationError(
+                {
+                    self.search_param: (
+                        "Поиск не поддерживает pagination=cursor, "
+                        "используйте постраничный вывод"
+                    )
+                }
+            )
+        return queryset.search(text)
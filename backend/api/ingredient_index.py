@@ -0,0 +1,66 @@
+from bisect import bisect_left
+from threading import Lock
+
+from recipes.models import Ingredient
+
+from .cache import get_versions
+
+
+def normalize(value):
+    return value.strip().casefold().replace("ё", "е")
+
+
+class IngredientIndex:
+    """Индекс каталога ингредиентов в памяти процесса.
+
+    Названия хранятся отсортированными после приведения регистра, поэтому
+    поиск по началу названия — это бинарный поиск без обращения к БД.
+    Процесс перечитывает каталог, когда меняется версия в общем кэше.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.keys = []
+        self.items = []
+        self.lock = Lock()
+
+    def load(self, version):
+        # Индекс живет до следующей смены версии, поэтому каталог читается
+        # с primary: отстающая реплика закрепила бы его старое состояние.
+        rows = sorted(
+            (
+                (normalize(row["name"]), row["id"], row)
+                for row in Ingredient.objects.using("default").values(
+                    "id", "name", "measurement_unit"
+                )
+            ),
+            key=lambda entry: entry[:2],
+        )
+        self.keys = [key for key, _, _ in rows]
+        self.items = [row for _, _, row in rows]
+        self.version = version
+
+    def refresh(self):
+        (version,) = get_versions("ingredients")
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.load(version)
+
+    def search(self, name):
+        """Сначала ингредиенты, начинающиеся с name, затем содержащие его."""
+        self.refresh()
+        keys, items = self.keys, self.items
+        query = normalize(name)
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        return items[start:end] + [
+            item
+            for key, item in zip(keys, items)
+            if query in key and not key.startswith(query)
+        ]
+
+
+ingredient_index = IngredientIndex()
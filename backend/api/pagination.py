@@ -0,0 +1,106 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RecipeKeysetPagination(BasePagination):
+    """Пагинация ленты рецептов по ключу (pub_date, id).
+
+    Следующая страница выбирается условием по ключу последнего рецепта,
+    поэтому глубокие страницы не дороже первой, а COUNT не выполняется.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = settings.REST_FRAMEWORK["PAGE_SIZE"]
+    max_page_size = 100
+    ordering = ("-pub_date", "-id")
+    invalid_cursor_message = "Неверный курсор"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            pub_date, pk = cursor
+            date_field, id_field = self.key_fields
+            # Условие <= дает границу диапазона для индекса.
+            queryset = queryset.filter(
+                Q(**{f"{date_field}__lte": pub_date}),
+                Q(**{f"{date_field}__lt": pub_date})
+                | Q(**{date_field: pub_date, f"{id_field}__lt": pk}),
+            )
+        results = list(queryset[: self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    @property
+    def key_fields(self):
+        return [field.lstrip("-") for field in self.ordering]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, pk = (
+                b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            )
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (BinasciiError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def encode_cursor(self, item):
+        pub_date, pk = (getattr(item, field) for field in self.key_fields)
+        position = f"{pub_date.isoformat()}|{pk}"
+        encoded = b64encode(position.encode("ascii")).decode("ascii")
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            encoded,
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+
+class FeedKeysetPagination(RecipeKeysetPagination):
+    """Пагинация ленты подписок по ключу (pub_date, recipe_id)."""
+
+    ordering = ("-pub_date", "-recipe_id")
@@ -1,12 +1,21 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.hashers import check_password
+from django.db import transaction
 from djoser.serializers import (PasswordSerializer, UserCreateSerializer,
                                 UserSerializer)
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from foodgram.replicas import use_replica
+from recipes.images import schedule_image_processing, stored_upload
 from recipes.models import (FavoriteRecipe, Ingredient, IngredientAmount,
-                            Recipe, ShoppingCart, Subscribe, Tag)
+                            Recipe, ShoppingCart, ShoppingListIngredient,
+                            Subscribe, Tag)
+
+from .cache import recipe_cache
+from .fields import DeferredBase64ImageField, PrimaryKeyListField
+
+IMAGE_FIELDS = ("image", "image_webp", "thumbnail")
 
 User = get_user_model()
 
@@ -26,6 +35,8 @@ class UserListSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         return (
             self.context.get("request").user.is_authenticated
             and Subscribe.objects.filter(
@@ -69,6 +80,15 @@ class TagSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class RecipeReadListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, "all") else data)
+        self.child.cached_cards = recipe_cache.get_many(
+            recipe.pk for recipe in recipes
+        )
+        return super().to_representation(recipes)
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     ingredients = IngrediendAmountSerializer(
         many=True,
@@ -93,11 +113,55 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_webp",
+            "thumbnail",
             "text",
             "cooking_time",
         )
+        list_serializer_class = RecipeReadListSerializer
+
+    def to_representation(self, instance):
+        cached_cards = getattr(self, "cached_cards", None)
+        if cached_cards is None:
+            data = recipe_cache.get(instance.pk)
+        else:
+            data = cached_cards.get(instance.pk)
+        if data is None:
+            data = super().to_representation(instance)
+            if use_replica.get():
+                # Отстающая реплика могла вернуть рецепт старше последней
+                # инвалидации, в общий кэш пишутся только данные с primary.
+                return data
+            recipe_cache.set(
+                instance.pk,
+                {
+                    **data,
+                    **{
+                        field: getattr(instance, field).url
+                        for field in IMAGE_FIELDS
+                        if getattr(instance, field)
+                    },
+                    "author": {**data["author"], "is_subscribed": None},
+                    "is_favorited": None,
+                    "is_in_shopping_cart": None,
+                },
+            )
+            return data
+        request = self.context.get("request")
+        if request is not None:
+            for field in IMAGE_FIELDS:
+                if data[field]:
+                    data[field] = request.build_absolute_uri(data[field])
+        data["author"]["is_subscribed"] = self.fields[
+            "author"
+        ].get_is_subscribed(instance.author)
+        data["is_favorited"] = self.get_is_favorited(instance)
+        data["is_in_shopping_cart"] = self.get_is_in_shopping_cart(instance)
+        return data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         return (
             self.context.get("request").user.is_authenticated
             and FavoriteRecipe.objects.filter(
@@ -106,6 +170,8 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         return (
             self.context.get("request").user.is_authenticated
             and ShoppingCart.objects.filter(
@@ -124,22 +190,19 @@ class IngredientsEditSerializer(serializers.ModelSerializer):
 
 
 class RecipeEditSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = DeferredBase64ImageField()
     ingredients = IngredientsEditSerializer(many=True)
     author = serializers.PrimaryKeyRelatedField(read_only=True)
+    tags = PrimaryKeyListField(
+        queryset=Tag.objects.all(),
+        error_messages={
+            "does_not_exist": "Ошибка в Тэге, id = {pk_value} не существует"
+        },
+    )
 
     class Meta:
         model = Recipe
         fields = "__all__"
-        extra_kwargs = {
-            "tags": {
-                "error_messages": {
-                    "does_not_exist": (
-                        "Ошибка в Тэге, id = {pk_value} не существует"
-                    )
-                }
-            }
-        }
 
     def validate(self, data):
         name = data.get("name")
@@ -148,11 +211,15 @@ class RecipeEditSerializer(serializers.ModelSerializer):
                 "Название рецепта минимум 4 символа"
             )
         ingredients = data.get("ingredients")
-        for ingredient in ingredients:
-            if not Ingredient.objects.filter(id=ingredient["id"]).exists():
-                raise serializers.ValidationError(
-                    f'Ингредиента с id - {ingredient["id"]} нет'
-                )
+        ids = [item["id"] for item in ingredients]
+        existing = set(
+            Ingredient.objects.filter(id__in=ids).values_list("id", flat=True)
+        )
+        missing = [pk for pk in dict.fromkeys(ids) if pk not in existing]
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиентов с id - {", ".join(map(str, missing))} нет'
+            )
         if len(ingredients) != len(set([item["id"] for item in ingredients])):
             raise serializers.ValidationError(
                 "Ингредиенты не должны повторяться!"
@@ -183,26 +250,75 @@ class RecipeEditSerializer(serializers.ModelSerializer):
         ]
         IngredientAmount.objects.bulk_create(ingredients_recipes)
 
+    def update_ingredients(self, ingredients, recipe):
+        """Меняет только отличающиеся строки и возвращает старые количества."""
+        current = {
+            row.ingredient_id: row
+            for row in IngredientAmount.objects.filter(recipe=recipe)
+        }
+        new_amounts = {item["id"]: item["amount"] for item in ingredients}
+        removed = [
+            row.pk
+            for ingredient_id, row in current.items()
+            if ingredient_id not in new_amounts
+        ]
+        if removed:
+            IngredientAmount.objects.filter(pk__in=removed).delete()
+        old_amounts = {
+            ingredient_id: row.amount for ingredient_id, row in current.items()
+        }
+        changed = []
+        for ingredient_id, row in current.items():
+            amount = new_amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ["amount"])
+        self.create_ingredients(
+            [item for item in ingredients if item["id"] not in current],
+            recipe,
+        )
+        return old_amounts
+
     def create(self, validated_data):
-        ingredients = validated_data.pop("ingredients")
-        tags = validated_data.pop("tags")
-        recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
-        self.create_ingredients(ingredients, recipe)
+        with stored_upload(validated_data.pop("image")) as image:
+            with transaction.atomic():
+                ingredients = validated_data.pop("ingredients")
+                tags = validated_data.pop("tags")
+                recipe = Recipe.objects.create(
+                    image=settings.RECIPE_IMAGE_PLACEHOLDER, **validated_data
+                )
+                recipe.tags.set(tags)
+                self.create_ingredients(ingredients, recipe)
+                schedule_image_processing(recipe, image)
         return recipe
 
     def update(self, instance, validated_data):
-        if "ingredients" in validated_data:
-            ingredients = validated_data.pop("ingredients")
-            instance.ingredients.clear()
-            self.create_ingredients(ingredients, instance)
-        if "tags" in validated_data:
-            instance.tags.set(validated_data.pop("tags"))
-        return super().update(instance, validated_data)
+        with stored_upload(validated_data.pop("image", None)) as image:
+            with transaction.atomic():
+                if "ingredients" in validated_data:
+                    ingredients = validated_data.pop("ingredients")
+                    old_amounts = self.update_ingredients(
+                        ingredients, instance
+                    )
+                    ShoppingListIngredient.objects.change_recipe(
+                        instance.pk,
+                        old_amounts,
+                        {item["id"]: item["amount"] for item in ingredients},
+                    )
+                if "tags" in validated_data:
+                    instance.tags.set(validated_data.pop("tags"))
+                instance = super().update(instance, validated_data)
+                if image is not None:
+                    schedule_image_processing(instance, image)
+        return instance
 
     def to_representation(self, instance):
+        request = self.context.get("request")
+        instance = Recipe.objects.for_read(request.user).get(pk=instance.pk)
         return RecipeReadSerializer(
-            instance, context={"request": self.context.get("request")}
+            instance, context={"request": request}
         ).data
 
 
@@ -227,10 +343,18 @@ class SetPasswordSerializer(PasswordSerializer):
         return data
 
 
+def get_recipes_limit(request):
+    try:
+        recipes_limit = int(request.query_params["recipes_limit"])
+    except (KeyError, ValueError):
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
+
+
 class SubscribeRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "thumbnail", "cooking_time")
 
 
 class SubscribeSerializer(serializers.ModelSerializer):
@@ -245,7 +369,7 @@ class SubscribeSerializer(serializers.ModelSerializer):
     )
     recipes = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source="author.recipe.count")
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Subscribe
@@ -274,13 +398,24 @@ class SubscribeSerializer(serializers.ModelSerializer):
         return data
 
     def get_recipes(self, obj):
-        recipes = obj.author.recipe.all()
+        latest_recipes = self.context.get("latest_recipes")
+        if latest_recipes is not None:
+            recipes = latest_recipes.get(obj.author_id, [])
+        else:
+            recipes = obj.author.recipe.all()
+            recipes_limit = get_recipes_limit(self.context.get("request"))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return SubscribeRecipeSerializer(recipes, many=True).data
 
+    def get_recipes_count(self, obj):
+        return obj.author.recipes_count
+
     def get_is_subscribed(self, obj):
-        return Subscribe.objects.filter(
-            user=self.context.get("request").user, author=obj.author
-        ).exists()
+        user = self.context.get("request").user
+        if obj.user_id == user.id:
+            return True
+        return Subscribe.objects.filter(user=user, author=obj.author).exists()
 
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
@@ -339,3 +474,11 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
                 "Рецепт уже добавлен в список покупок"
             )
         return data
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
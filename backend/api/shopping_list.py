@@ -0,0 +1,68 @@
+import csv
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+from foodgram.streams import Echo
+
+TITLE = "Список покупок"
+NAME = "ingredient__name"
+UNIT = "ingredient__measurement_unit"
+AMOUNT = "amount"
+PDF_LINES_PER_PAGE = 45
+CHUNK_SIZE = 64 * 1024
+
+
+def item_line(item):
+    return f"{item[NAME]} ({item[UNIT]}) — {item[AMOUNT]}"
+
+
+def txt_rows(items):
+    yield f"{TITLE}:\n\n"
+    for item in items:
+        yield f"{item_line(item)}\n"
+
+
+def csv_rows(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("Ингредиент", "Единица измерения", "Количество"))
+    for item in items:
+        yield writer.writerow((item[NAME], item[UNIT], item[AMOUNT]))
+
+
+def pdf_rows(items):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.pdfgen import canvas
+
+    pdfmetrics.registerFont(TTFont("ShoppingList", settings.PDF_FONT_PATH))
+    width, height = A4
+    with SpooledTemporaryFile(max_size=CHUNK_SIZE) as buffer:
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setTitle(TITLE)
+        page, line = 1, 0
+        for item in items:
+            if line == 0:
+                pdf.setFont("ShoppingList", 16)
+                pdf.drawString(50, height - 60, f"{TITLE}, стр. {page}")
+                pdf.setFont("ShoppingList", 12)
+            line += 1
+            pdf.drawString(50, height - 80 - line * 16, item_line(item))
+            if line == PDF_LINES_PER_PAGE:
+                pdf.showPage()
+                page, line = page + 1, 0
+        pdf.save()
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+FORMATS = {
+    "txt": (txt_rows, "text/plain; charset=utf-8"),
+    "csv": (csv_rows, "text/csv; charset=utf-8"),
+    "pdf": (pdf_rows, "application/pdf"),
+}
@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientAmount,
+                            Recipe, ShoppingCart, Subscribe, Tag)
+
+from .cache import bump_versions, recipe_cache, token_cache
+
+User = get_user_model()
+
+
+def invalidate_recipes(recipe_ids):
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: recipe_cache.invalidate(*recipe_ids))
+        on_commit_bump(*(f"recipe:{recipe_id}" for recipe_id in recipe_ids))
+
+
+def on_commit_bump(*names):
+    transaction.on_commit(lambda: bump_versions(*names))
+
+
+def related_recipe_ids(instance):
+    if isinstance(instance, Tag):
+        recipes = instance.recipes.all()
+    else:
+        recipes = Recipe.objects.filter(ingredients=instance)
+    return recipes.values_list("id", flat=True)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def ingredient_amount_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action.startswith("post_"):
+            invalidate_recipes([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        invalidate_recipes(pk_set)
+    elif action == "pre_clear":
+        invalidate_recipes(related_recipe_ids(instance))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def catalogue_changed(sender, instance, **kwargs):
+    invalidate_recipes(related_recipe_ids(instance))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(sender, instance, **kwargs):
+    on_commit_bump("tags")
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(sender, instance, **kwargs):
+    on_commit_bump("ingredients")
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscribe)
+@receiver(post_delete, sender=Subscribe)
+def user_flags_changed(sender, instance, **kwargs):
+    on_commit_bump(f"user:{instance.user_id}")
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_recipes(instance.recipe.values_list("id", flat=True))
+
+
+def invalidate_tokens(keys):
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: token_cache.invalidate(*keys))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields, **kwargs):
+    """Пароль, активность и данные пользователя в кэше токенов."""
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list("key", flat=True)
+    )
@@ -0,0 +1,8 @@
+from django.urls import include, path
+
+from api.urls import async_urlpatterns, urlpatterns
+
+# Маршруты как под ASGI с ASYNC_READ_VIEWS=1.
+urlpatterns = [
+    path("api/", include((async_urlpatterns + urlpatterns, "api"))),
+]
@@ -0,0 +1,73 @@
+from django.core.handlers.asgi import ASGIHandler
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, ShoppingListIngredient, User
+
+
+async def asgi_get(path, query_string=b"", headers=()):
+    """Запрос через ASGI-приложение, как его выполняет сервер."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "query_string": query_string,
+        "headers": [(b"host", b"testserver"), *headers],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 0),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await ASGIHandler()(scope, receive, send)
+    body = b"".join(
+        message.get("body", b"")
+        for message in messages
+        if message["type"] == "http.response.body"
+    )
+    return messages[0]["status"], body
+
+
+class ASGITests(TransactionTestCase):
+    """Запросы через ASGI-приложение, как под uvicorn."""
+
+    def setUp(self):
+        user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        ShoppingListIngredient.objects.create(
+            user=user,
+            ingredient=Ingredient.objects.create(
+                name="Мука", measurement_unit="г"
+            ),
+            amount=200,
+        )
+        token = Token.objects.create(user=user)
+        self.headers = ((b"authorization", f"Token {token}".encode()),)
+
+    async def test_download_shopping_cart(self):
+        for file_format in ("txt", "csv"):
+            with self.subTest(file_format=file_format):
+                status, body = await asgi_get(
+                    "/api/recipes/download_shopping_cart/",
+                    f"file_format={file_format}".encode(),
+                    self.headers,
+                )
+                self.assertEqual(status, 200)
+                self.assertIn("Мука", body.decode())
+
+    @override_settings(ROOT_URLCONF="api.tests.async_urls")
+    async def test_async_views(self):
+        paths = ("/api/tags/", "/api/recipes/", "/api/users/subscriptions/")
+        for path in paths:
+            with self.subTest(path=path):
+                status, body = await asgi_get(path, headers=self.headers)
+                self.assertEqual(status, 200, body)
@@ -0,0 +1,123 @@
+from time import time
+
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils.http import http_date
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientAmount,
+                            Recipe, Subscribe, Tag, User)
+
+URLS = (
+    "/api/recipes/",
+    "/api/recipes/?page=2&limit=2",
+    "/api/recipes/?page=99",
+    "/api/recipes/?tags=lunch&tags=breakfast",
+    "/api/recipes/?is_favorited=1",
+    "/api/recipes/?search=Рецепт",
+    "/api/recipes/?pagination=cursor&limit=2",
+    "/api/recipes/{recipe}/",
+    "/api/recipes/999999/",
+    "/api/tags/",
+    "/api/tags/{tag}/",
+    "/api/ingredients/",
+    "/api/ingredients/?name=про",
+    "/api/ingredients/{ingredient}/",
+    "/api/users/subscriptions/",
+    "/api/users/subscriptions/?recipes_limit=1",
+)
+
+
+class AsyncViewParityTests(APITestCase):
+    """Асинхронные view отвечают так же, как синхронные viewset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        Subscribe.objects.create(user=cls.user, author=author)
+        cls.tag = Tag.objects.create(name="Обед", slug="lunch", color=None)
+        cls.ingredient = Ingredient.objects.create(
+            name="Продукт", measurement_unit="г"
+        )
+        for n in range(3):
+            recipe = Recipe.objects.create(
+                author=author,
+                name=f"Рецепт {n}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/placeholder.png",
+            )
+            recipe.tags.set([cls.tag])
+            IngredientAmount.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=5
+            )
+        FavoriteRecipe.objects.create(user=cls.user, favorite_recipe=recipe)
+        cls.recipe = recipe
+        cls.token = Token.objects.create(user=cls.user)
+
+    def urls(self):
+        for url in URLS:
+            yield url.format(
+                recipe=self.recipe.pk,
+                tag=self.tag.pk,
+                ingredient=self.ingredient.pk,
+            )
+
+    def clients(self):
+        yield "anonymous", {}
+        yield "token", {"HTTP_AUTHORIZATION": f"Token {self.token}"}
+        yield "bad token", {"HTTP_AUTHORIZATION": "Token missing"}
+
+    def responses(self, url, headers):
+        cache.clear()
+        sync = self.client.get(url, **headers)
+        cache.clear()
+        with override_settings(ROOT_URLCONF="api.tests.async_urls"):
+            asynchronous = self.client.get(url, **headers)
+        return sync, asynchronous
+
+    def test_parity(self):
+        for url in self.urls():
+            for name, headers in self.clients():
+                with self.subTest(url=url, client=name):
+                    sync, asynchronous = self.responses(url, headers)
+                    self.assertEqual(
+                        asynchronous.status_code, sync.status_code
+                    )
+                    self.assertJSONEqual(
+                        asynchronous.content, sync.content.decode()
+                    )
+                    self.assertEqual(
+                        asynchronous.has_header("ETag"),
+                        sync.has_header("ETag"),
+                    )
+
+    def test_conditional_get(self):
+        url = f"/api/recipes/{self.recipe.pk}/"
+        for urlconf in ("foodgram.urls", "api.tests.async_urls"):
+            with self.subTest(urlconf=urlconf), override_settings(
+                ROOT_URLCONF=urlconf
+            ):
+                cache.clear()
+                response = self.client.get(url)
+                etag = response["ETag"]
+                self.assertFalse(response.has_header("Last-Modified"))
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                # Без Last-Modified дата от клиента не дает 304: версии
+                # различаются точнее, чем до секунды.
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date(time() + 60)
+                )
+                self.assertEqual(response.status_code, 200)
+                with self.captureOnCommitCallbacks(execute=True):
+                    Recipe.objects.get(pk=self.recipe.pk).save()
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response["ETag"], etag)
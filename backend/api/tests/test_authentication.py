@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.cache import token_cache
+from recipes.models import User
+
+ME_URL = "/api/users/me/"
+
+
+class TokenCacheTests(APITestCase):
+    """Кэш токенов и его сброс при выходе, смене пароля и блокировке."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="cook@example.com",
+            username="cook",
+            first_name="Иван",
+            last_name="Петров",
+            password="Old-password-1",
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def get_me(self):
+        return self.client.get(ME_URL)
+
+    def test_cached_value(self):
+        self.assertEqual(self.get_me().status_code, 200)
+        self.assertEqual(
+            token_cache.get(self.token.key),
+            {
+                "key": self.token.key,
+                "user_id": self.user.id,
+                "is_active": True,
+            },
+        )
+
+    def test_cached_user(self):
+        self.get_me()
+        with self.assertNumQueries(2):
+            response = self.get_me()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["email"], self.user.email)
+        self.assertEqual(response.data["first_name"], "Иван")
+
+    def test_logout(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/auth/token/logout/")
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_token_delete(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.delete()
+        self.assertEqual(self.get_me().status_code, 401)
+
+    def test_set_password(self):
+        self.get_me()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/users/set_password/",
+                {
+                    "current_password": "Old-password-1",
+                    "new_password": "New-password-2",
+                },
+            )
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("New-password-2"))
+        self.assertEqual(self.user.first_name, "Иван")
+
+    def test_deactivation(self):
+        self.get_me()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.get_me().status_code, 401)
+        self.assertFalse(token_cache.get(self.token.key)["is_active"])
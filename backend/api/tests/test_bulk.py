@@ -0,0 +1,48 @@
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from recipes.models import FavoriteRecipe, Recipe, User
+
+
+class BulkChangeTests(APITestCase):
+    """Итог по каждому id при добавлении и удалении рецептов списком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.user,
+                name=f"Рецепт {n}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/placeholder.png",
+            )
+            for n in range(2)
+        ]
+        FavoriteRecipe.objects.create(
+            user=cls.user, favorite_recipe=cls.recipes[0]
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token}")
+
+    def test_delete_statuses(self):
+        missing = self.recipes[1].pk + 1
+        response = self.client.delete(
+            "/api/recipes/favorite/",
+            {"recipes": [self.recipes[0].pk, self.recipes[1].pk, missing]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"id": self.recipes[0].pk, "status": "removed"},
+                {"id": self.recipes[1].pk, "status": "absent"},
+                {"id": missing, "status": "not_found"},
+            ],
+        )
@@ -0,0 +1,118 @@
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from recipes.management.commands.data_test import deferred_indexes
+from recipes.models import FeedItem, Ingredient, Recipe, Subscribe, User
+
+
+def index_exists(name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [name])
+        return cursor.fetchone() is not None
+
+
+class DataCommandTests(TransactionTestCase):
+    """Загрузка данных в отдельной транзакции, как из manage.py."""
+
+    reset_sequences = True
+
+    def setUp(self):
+        call_command("import_tags", stdout=StringIO())
+        call_command("import_ingredients", stdout=StringIO())
+
+    def test_data_test(self):
+        call_command("data_test", stdout=StringIO())
+        self.assertEqual(Recipe.objects.count(), 7)
+        self.assertTrue(index_exists("recipe_search_idx"))
+        self.assertFalse(Recipe.objects.filter(search_vector=None).exists())
+
+    def test_generate_data(self):
+        call_command(
+            "generate_data",
+            users=2,
+            recipes=3,
+            ingredients=(1, 2),
+            favorites=1,
+            cart=1,
+            subscriptions=1,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Recipe.objects.count(), 3)
+        self.assertTrue(index_exists("recipe_search_idx"))
+        self.assertFalse(Recipe.objects.filter(search_vector=None).exists())
+
+    def test_index_restored_after_failed_load(self):
+        with self.assertRaises(RuntimeError):
+            with deferred_indexes([Recipe]):
+                self.assertFalse(index_exists("recipe_search_idx"))
+                raise RuntimeError
+        self.assertTrue(index_exists("recipe_search_idx"))
+
+
+class ImportIngredientsTests(TestCase):
+    def test_json_skips_non_objects(self):
+        items = [
+            {"name": "соль", "measurement_unit": "г"},
+            "перец",
+            ["сахар", "г"],
+            None,
+            {"name": "мука", "measurement_unit": "г"},
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            json.dump(items, file, ensure_ascii=False)
+            file.flush()
+            result = call_command(
+                "import_ingredients", file.name, stdout=StringIO()
+            )
+        self.assertIn("добавлено: 2", result)
+        self.assertIn("пропущено некорректных: 3", result)
+        self.assertEqual(
+            set(Ingredient.objects.values_list("name", flat=True)),
+            {"соль", "мука"},
+        )
+
+
+class RepairFeedsTests(TestCase):
+    """Рассылка, потерянная при перезапуске воркера, восстанавливается.
+
+    В TestCase колбэки on_commit не выполняются, поэтому рецепты не
+    попадают в ленты, как если бы воркер перезапустился до рассылки.
+    """
+
+    def test_repair_feeds(self):
+        author, reader = (
+            User.objects.create_user(username=name, email=f"{name}@mail.ru")
+            for name in ("author", "reader")
+        )
+        Subscribe.objects.create(user=reader, author=author)
+        old, new = (
+            Recipe.objects.create(
+                author=author,
+                name=name,
+                text="Описание",
+                cooking_time=10,
+                image="recipes/placeholder.png",
+            )
+            for name in ("Старый", "Новый")
+        )
+        Recipe.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=2)
+        )
+        self.assertFalse(FeedItem.objects.exists())
+        result = call_command("repair_feeds", hours=24, stdout=StringIO())
+        self.assertEqual(result, "Добавлено записей в ленты: 1")
+        self.assertEqual(
+            list(FeedItem.objects.values_list("user", "recipe")),
+            [(reader.pk, new.pk)],
+        )
+        call_command("repair_feeds", stdout=StringIO())
+        self.assertEqual(FeedItem.objects.filter(user=reader).count(), 2)
+        result = call_command("repair_feeds", stdout=StringIO())
+        self.assertEqual(result, "Добавлено записей в ленты: 0")
@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+from base64 import b64decode, b64encode
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from recipes import images
+from recipes.models import Recipe, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+OLD_IMAGE = "recipes/images/old.jpg"
+
+
+def files(field):
+    try:
+        return default_storage.listdir(field.upload_to)[1]
+    except FileNotFoundError:
+        return []
+
+
+def payload(color):
+    buffer = BytesIO()
+    Image.new("RGB", (40, 30), color).save(buffer, "PNG")
+    return b64encode(buffer.getvalue()).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+@mock.patch.object(images, "executor", None)
+class RecipeImageTests(TransactionTestCase):
+    """Загрузки переживают потерю задачи, замененные файлы удаляются."""
+
+    def setUp(self):
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        self.recipe = Recipe.objects.create(
+            author=author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image=default_storage.save(OLD_IMAGE, ContentFile(b"")),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def upload(self, recipe, color):
+        with images.stored_upload(payload(color)) as source:
+            with transaction.atomic():
+                images.schedule_image_processing(recipe, source)
+
+    def assert_processed(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual(recipe.image_source, "")
+        for field in images.VARIANTS:
+            self.assertTrue(
+                default_storage.exists(getattr(recipe, field).name)
+            )
+        self.assertFalse(default_storage.exists(OLD_IMAGE))
+        self.assertEqual(files(Recipe._meta.get_field("image_source")), [])
+        return recipe
+
+    def test_replaced_files_deleted(self):
+        self.upload(self.recipe, "red")
+        recipe = self.assert_processed()
+        self.upload(recipe, "blue")
+        self.assert_processed()
+        for field in images.VARIANTS:
+            self.assertFalse(
+                default_storage.exists(getattr(recipe, field).name)
+            )
+
+    def test_rolled_back_upload_deleted(self):
+        with self.assertRaises(IntegrityError):
+            with images.stored_upload(payload("red")) as source:
+                with transaction.atomic():
+                    images.schedule_image_processing(self.recipe, source)
+                    Recipe.objects.create(author_id=0, cooking_time=1)
+        self.assertFalse(default_storage.exists(source))
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).image_source, ""
+        )
+
+    def test_lost_job_retried_by_command(self):
+        with mock.patch.object(images, "submit"):
+            self.upload(self.recipe, "red")
+        source = Recipe.objects.get(pk=self.recipe.pk).image_source.name
+        self.assertTrue(default_storage.exists(source))
+        call_command("make_image_variants", stdout=StringIO())
+        self.assert_processed()
+
+    def test_superseded_upload_discarded(self):
+        with mock.patch.object(images, "submit"):
+            self.upload(self.recipe, "red")
+        fields = [Recipe._meta.get_field(name) for name in images.VARIANTS]
+        before = [files(field) for field in fields]
+        file = BytesIO(b64decode(payload("green")))
+        self.assertFalse(
+            images.process_recipe_image(self.recipe.pk, file, "other")
+        )
+        self.assertEqual([files(field) for field in fields], before)
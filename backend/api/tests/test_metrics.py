@@ -0,0 +1,40 @@
+import time
+
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from prometheus_client import REGISTRY
+
+from foodgram.metrics import observe
+from foodgram.profiling import SQLProfile, record_queries
+from recipes.models import User
+
+
+def sample(name):
+    return REGISTRY.get_sample_value(name, {"view": "unmatched"}) or 0
+
+
+class StreamingMetricsTests(TestCase):
+    """Метрики потокового ответа пишутся после отдачи тела."""
+
+    def test_recorded_after_body(self):
+        record_queries()
+
+        def body():
+            yield b"first"
+            User.objects.exists()
+            yield b"second"
+
+        queries = sample("foodgram_request_queries_sum")
+        sizes = sample("foodgram_response_size_bytes_sum")
+        response = observe(
+            RequestFactory().get("/"),
+            StreamingHttpResponse(body()),
+            SQLProfile(),
+            time.perf_counter(),
+        )
+        self.assertEqual(sample("foodgram_response_size_bytes_sum"), sizes)
+        self.assertEqual(b"".join(response.streaming_content), b"firstsecond")
+        self.assertEqual(sample("foodgram_request_queries_sum"), queries + 1)
+        self.assertEqual(
+            sample("foodgram_response_size_bytes_sum"), sizes + 11
+        )
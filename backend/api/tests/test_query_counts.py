@@ -0,0 +1,162 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from api.cache import recipe_cache
+from foodgram.replicas import use_replica
+from recipes.models import (FavoriteRecipe, Ingredient, IngredientAmount,
+                            Recipe, ShoppingCart, Subscribe, Tag, User)
+
+PNG = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA"
+    "DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeQueryCountTests(APITestCase):
+    """Число запросов не зависит от числа рецептов на странице."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="reader", email="reader@example.com", password="pass"
+        )
+        cls.author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        Subscribe.objects.create(user=cls.user, author=cls.author)
+        cls.tags = [
+            Tag.objects.create(name=name, slug=slug, color=color)
+            for name, slug, color in (
+                ("Завтрак", "breakfast", Tag.GREEN),
+                ("Обед", "lunch", Tag.ORANGE),
+            )
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"Продукт {n}", measurement_unit="г"
+            )
+            for n in range(3)
+        ]
+        cls.recipes = []
+        for n in range(8):
+            recipe = Recipe.objects.create(
+                author=cls.author if n % 2 else cls.user,
+                name=f"Рецепт {n}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/placeholder.png",
+            )
+            recipe.tags.set(cls.tags)
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient, amount=10
+                )
+                for ingredient in cls.ingredients
+            )
+            FavoriteRecipe.objects.create(
+                user=cls.user, favorite_recipe=recipe
+            )
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+            cls.recipes.append(recipe)
+        cls.token = Token.objects.create(user=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def recipe_data(self, name):
+        return {
+            "name": name,
+            "text": "Описание",
+            "cooking_time": 15,
+            "image": PNG,
+            "tags": [tag.id for tag in self.tags],
+            "ingredients": [
+                {"id": ingredient.id, "amount": 5}
+                for ingredient in self.ingredients
+            ],
+        }
+
+    def assert_list_queries(self, url, number, size):
+        with self.assertNumQueries(number):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), size)
+
+    def test_list(self):
+        # Токен, COUNT, страница, автор, теги, ингредиенты.
+        self.assert_list_queries("/api/recipes/", 6, 6)
+        cache.clear()
+        self.assert_list_queries("/api/recipes/?page=2", 6, 2)
+
+    def test_list_cursor(self):
+        url = "/api/recipes/?pagination=cursor&limit="
+        self.assert_list_queries(f"{url}2", 5, 2)
+        cache.clear()
+        self.assert_list_queries(f"{url}8", 5, 8)
+
+    def test_list_anonymous(self):
+        self.client.credentials()
+        self.assert_list_queries("/api/recipes/", 5, 6)
+
+    def test_detail(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(f"/api/recipes/{self.recipes[0].pk}/")
+        self.assertEqual(response.status_code, 200)
+
+    def get_from_replica(self, url):
+        token = use_replica.set(True)
+        try:
+            return self.client.get(url)
+        finally:
+            use_replica.reset(token)
+
+    def test_replica_read_not_cached(self):
+        recipe_id = self.recipes[0].pk
+        response = self.get_from_replica("/api/recipes/?limit=8")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(recipe_cache.get(recipe_id))
+        self.get_from_replica(f"/api/recipes/{recipe_id}/")
+        self.assertIsNotNone(recipe_cache.get(recipe_id))
+
+    def test_create(self):
+        with self.assertNumQueries(17):
+            response = self.client.post(
+                "/api/recipes/",
+                self.recipe_data("Новый рецепт"),
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        recipe = self.recipes[0]
+        with self.assertNumQueries(20):
+            response = self.client.put(
+                f"/api/recipes/{recipe.pk}/",
+                self.recipe_data(recipe.name),
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_save_without_text_skips_search_vector(self):
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        recipe.cooking_time = 20
+        with self.assertNumQueries(1):
+            recipe.save()
+        with self.assertNumQueries(1):
+            recipe.save(update_fields=("image", "image_webp", "thumbnail"))
+        recipe.name = "Новое название"
+        with self.assertNumQueries(2):
+            recipe.save()
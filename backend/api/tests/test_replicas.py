@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.connection import ConnectionDoesNotExist
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from foodgram import replicas
+from foodgram.replicas import ReplicaRouter, replica_middleware, use_replica
+from recipes.models import Recipe, Tag, User
+
+REPLICA = "replica_1"
+with_replica = mock.patch.object(
+    replicas, "replica_aliases", lambda: [REPLICA]
+)
+
+
+@with_replica
+class ReplicaRouterTests(SimpleTestCase):
+    def read(self, model):
+        token = use_replica.set(True)
+        try:
+            return ReplicaRouter().db_for_read(model)
+        finally:
+            use_replica.reset(token)
+
+    def test_reads(self):
+        self.assertEqual(self.read(Recipe), REPLICA)
+        self.assertEqual(ReplicaRouter().db_for_read(Recipe), "default")
+
+    def test_tokens_read_from_primary(self):
+        self.assertEqual(self.read(Token), "default")
+
+    def test_writes(self):
+        token = use_replica.set(True)
+        try:
+            self.assertEqual(ReplicaRouter().db_for_write(Recipe), "default")
+        finally:
+            use_replica.reset(token)
+
+
+@with_replica
+class ReplicaMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.seen = []
+
+    def get_response(self, request):
+        self.seen.append(use_replica.get())
+
+    def request(self, method, client):
+        # Без реплик middleware не включается, поэтому создается в тесте.
+        replica_middleware(self.get_response)(
+            RequestFactory().generic(method, "/", HTTP_AUTHORIZATION=client)
+        )
+        return self.seen[-1]
+
+    def test_safe_requests_read_replica(self):
+        self.assertTrue(self.request("GET", "Token a"))
+
+    def test_pinned_after_write(self):
+        self.assertFalse(self.request("POST", "Token a"))
+        self.assertFalse(self.request("GET", "Token a"))
+        self.assertTrue(self.request("GET", "Token b"))
+
+
+@with_replica
+class VersionedPrimaryTests(APITestCase):
+    """Ответы с ETag читаются с primary, остальные GET — с реплики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        cls.tag = Tag.objects.create(name="Обед", slug="lunch", color=None)
+        cls.recipe = Recipe.objects.create(
+            author=author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/placeholder.png",
+        )
+
+    def get(self, url):
+        token = use_replica.set(True)
+        try:
+            return self.client.get(url)
+        finally:
+            use_replica.reset(token)
+
+    def test_versioned_read_primary(self):
+        for url in (
+            f"/api/recipes/{self.recipe.pk}/",
+            f"/api/tags/{self.tag.pk}/",
+            "/api/tags/",
+        ):
+            with self.subTest(url=url):
+                response = self.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.has_header("ETag"))
+
+    def test_other_reads_use_replica(self):
+        with self.assertRaises(ConnectionDoesNotExist):
+            self.get("/api/recipes/")
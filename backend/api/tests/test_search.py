@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe, User
+
+
+class RecipeSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass"
+        )
+        for name, text in (
+            ("Сыр на гриле", "Жареный сыр с травами"),
+            ("Салат", "Овощи и немного сыра"),
+            ("Каша", "Овсянка на молоке"),
+        ):
+            Recipe.objects.create(
+                author=author,
+                name=name,
+                text=text,
+                image="recipes/placeholder.png",
+            )
+
+    def test_ranked_search(self):
+        response = self.client.get("/api/recipes/?search=сыр")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe["name"] for recipe in response.data["results"]],
+            ["Сыр на гриле", "Салат"],
+        )
+
+    def test_search_with_cursor_rejected(self):
+        response = self.client.get(
+            "/api/recipes/?search=сыр&pagination=cursor"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("search", response.data)
+
+
+class IngredientSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name in (
+            "Масло сливочное",
+            "Свёкла",
+            "Свекольный сок",
+            "Сливки",
+            "Ёжевика",
+            "Сметана",
+        ):
+            Ingredient.objects.create(name=name, measurement_unit="г")
+
+    def setUp(self):
+        # Новая версия каталога: индекс перечитает ингредиенты теста.
+        cache.clear()
+
+    def search(self, name):
+        response = self.client.get("/api/ingredients/", {"name": name})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient["name"] for ingredient in response.data]
+
+    def test_yo_folding(self):
+        self.assertEqual(self.search("свекл"), ["Свёкла"])
+        self.assertEqual(self.search("свёкл"), ["Свёкла"])
+        self.assertEqual(self.search("Еж"), ["Ёжевика"])
+
+    def test_prefix_before_substring(self):
+        self.assertEqual(self.search("сли"), ["Сливки", "Масло сливочное"])
+        # Совпадения по началу упорядочены по названию после замены ё на е.
+        self.assertEqual(self.search("СВЕ"), ["Свёкла", "Свекольный сок"])
@@ -0,0 +1,68 @@
+from django.test import TestCase
+
+from recipes.models import (Ingredient, IngredientAmount, Recipe, ShoppingCart,
+                            ShoppingListIngredient, User, recipe_amounts)
+
+
+class ChangeRecipeTests(TestCase):
+    """Изменение рецепта переносится во все корзины с ним сразу."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                username=f"user{n}", email=f"user{n}@example.com"
+            )
+            for n in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f"Продукт {n}", measurement_unit="г"
+            )
+            for n in range(3)
+        ]
+        cls.recipe, other = (
+            Recipe.objects.create(
+                author=cls.users[0],
+                name=f"Рецепт {n}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/placeholder.png",
+            )
+            for n in range(2)
+        )
+        for recipe in (cls.recipe, other):
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(
+                    recipe=recipe, ingredient=ingredient, amount=5
+                )
+                for ingredient in cls.ingredients[:2]
+            )
+        for user in cls.users[:2]:
+            ShoppingCart.objects.create(user=user, recipe=cls.recipe)
+        ShoppingCart.objects.create(user=cls.users[0], recipe=other)
+
+    def totals(self, user):
+        return dict(
+            ShoppingListIngredient.objects.filter(user=user).values_list(
+                "ingredient_id", "amount"
+            )
+        )
+
+    def test_change_recipe(self):
+        first, second, third = self.ingredients
+        old_amounts = recipe_amounts(self.recipe.id)
+        new_amounts = {second.id: 2, third.id: 7}
+        # Точка сохранения, UPDATE, DELETE, INSERT, снятие точки.
+        with self.assertNumQueries(5):
+            ShoppingListIngredient.objects.change_recipe(
+                self.recipe.id, old_amounts, new_amounts
+            )
+        self.assertEqual(
+            self.totals(self.users[0]),
+            {first.id: 5, second.id: 7, third.id: 7},
+        )
+        self.assertEqual(
+            self.totals(self.users[1]), {second.id: 2, third.id: 7}
+        )
+        self.assertEqual(self.totals(self.users[2]), {})
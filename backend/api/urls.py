@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
+from . import async_views
 from .views import (CustomUserViewSet, FavoriteRecipeViewSet,
                     IngredientViewSet, RecipeViewSet, ShoppingCartViewSet,
                     SubscribeViewSet, TagViewSet)
@@ -26,7 +28,19 @@ router.register(
     basename="shoppingcart",
 )
 
+# Под ASGI частые GET-запросы обслуживаются асинхронными представлениями.
+async_urlpatterns = [
+    path("recipes/", async_views.recipe_list),
+    path("recipes/<int:pk>/", async_views.recipe_detail),
+    path("tags/", async_views.tag_list),
+    path("tags/<int:pk>/", async_views.tag_detail),
+    path("ingredients/", async_views.ingredient_list),
+    path("ingredients/<int:pk>/", async_views.ingredient_detail),
+    path("users/subscriptions/", async_views.subscriptions),
+]
+
 urlpatterns = [
+    *(async_urlpatterns if settings.ASYNC_READ_VIEWS else ()),
     path("", include(router.urls)),
     path("", include("djoser.urls")),
     path("auth/", include("djoser.urls.authtoken")),
@@ -1,7 +1,13 @@
+from functools import wraps
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -9,65 +15,215 @@ from rest_framework.permissions import (SAFE_METHODS, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from foodgram.replicas import primary_reads
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe, ShoppingCart,
-                            Subscribe, Tag)
+                            ShoppingListIngredient, Subscribe, Tag,
+                            change_counter)
 
-from .filters import IngredientFilter, RecipesFilter
+from . import shopping_list
+from .cache import bump_versions, get_versions, versions_etag
+from .filters import IngredientFilter, RecipeSearchFilter, RecipesFilter
+from .ingredient_index import ingredient_index
 from .mixins import CreateDestroyViewSet
+from .pagination import FeedKeysetPagination, RecipeKeysetPagination
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (FavoriteRecipeSerializer, IngredientSerializer,
-                          RecipeEditSerializer, RecipeReadSerializer,
-                          SetPasswordSerializer, ShoppingCartSerializer,
-                          SubscribeSerializer, TagSerializer,
-                          UserCreateSerializer, UserListSerializer)
+                          RecipeEditSerializer, RecipeIdsSerializer,
+                          RecipeReadSerializer, SetPasswordSerializer,
+                          ShoppingCartSerializer, SubscribeSerializer,
+                          TagSerializer, UserCreateSerializer,
+                          UserListSerializer, get_recipes_limit)
 
 User = get_user_model()
 
 
+def versioned(get_names):
+    """Условный GET по версиям ресурсов: 304 без запроса к БД.
+
+    Версии меняются при коммите на primary, поэтому и тело читается с
+    primary: ответ отстающей реплики закрепился бы у клиента под новым
+    ETag до следующей записи. Last-Modified не отдается: с точностью до
+    секунды он не различает две записи за одну секунду, и клиент с одним
+    If-Modified-Since получил бы 304 на устаревшие данные.
+    """
+    conditional = condition(
+        etag_func=lambda request, *args, **kwargs: versions_etag(
+            get_versions(*get_names(request, **kwargs))
+        ),
+    )
+
+    def decorator(view):
+        view = conditional(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            with primary_reads():
+                return view(request, *args, **kwargs)
+
+        return inner
+
+    return method_decorator(decorator)
+
+
+def recipe_versions(request, pk):
+    if request.user.is_authenticated:
+        return (f"recipe:{pk}", f"user:{request.user.id}")
+    return (f"recipe:{pk}",)
+
+
 class RecipeViewSet(viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     filterset_class = RecipesFilter
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
+
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return self.queryset.for_read(self.request.user)
+        return self.queryset
+
+    @property
+    def paginator(self):
+        if (
+            self.pagination_class is not None
+            and self.request.query_params.get("pagination") == "cursor"
+        ):
+            self.pagination_class = RecipeKeysetPagination
+        return super().paginator
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeEditSerializer
 
+    @versioned(recipe_versions)
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        patch_vary_headers(response, ("Authorization",))
+        return response
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(
+        detail=False,
+        methods=("get",),
+        permission_classes=(IsAuthenticated,),
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые первыми."""
+        paginator = FeedKeysetPagination()
+        items = paginator.paginate_queryset(
+            request.user.feed.all(), request, view=self
+        )
+        recipes = self.get_queryset().in_bulk(
+            [item.recipe_id for item in items]
+        )
+        serializer = RecipeReadSerializer(
+            [
+                recipes[item.recipe_id]
+                for item in items
+                if item.recipe_id in recipes
+            ],
+            many=True,
+            context=self.get_serializer_context(),
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @transaction.atomic
+    def change_many(self, request, model):
+        """Добавляет или удаляет рецепты списком, с итогом по каждому id."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data["recipes"]))
+        user_id = request.user.id
+        statuses = dict.fromkeys(recipe_ids, "not_found")
+        if request.method == "POST":
+            recipes = Recipe.objects.filter(id__in=recipe_ids)
+            statuses.update(
+                dict.fromkeys(recipes.values_list("id", flat=True), "exists")
+            )
+            changed = model.objects.add_many(user_id, recipe_ids)
+            statuses.update(dict.fromkeys(changed, "added"))
+            sign = 1
+        else:
+            changed = model.objects.remove_many(user_id, recipe_ids)
+            statuses.update(dict.fromkeys(changed, "removed"))
+            missing = set(recipe_ids).difference(changed)
+            if missing:
+                recipes = Recipe.objects.filter(id__in=missing)
+                statuses.update(
+                    dict.fromkeys(
+                        recipes.values_list("id", flat=True), "absent"
+                    )
+                )
+            sign = -1
+        if changed:
+            if model is ShoppingCart:
+                ShoppingListIngredient.objects.add_recipes(
+                    user_id, changed, sign
+                )
+            else:
+                change_counter(Recipe, "favorites_count", changed, sign)
+            transaction.on_commit(lambda: bump_versions(f"user:{user_id}"))
+        return Response(
+            {
+                "results": [
+                    {"id": recipe_id, "status": recipe_status}
+                    for recipe_id, recipe_status in statuses.items()
+                ]
+            }
+        )
+
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        url_path="favorite",
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_many(self, request):
+        return self.change_many(request, FavoriteRecipe)
+
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        url_path="shopping_cart",
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_many(self, request):
+        return self.change_many(request, ShoppingCart)
+
     @action(
         detail=False,
         methods=("get",),
         url_path="download_shopping_cart",
         pagination_class=None,
+        permission_classes=(IsAuthenticated,),
     )
     def download_file(self, request):
         user = request.user
-        if not user.shopping_cart.exists():
+        file_format = request.query_params.get("file_format", "txt")
+        if file_format not in shopping_list.FORMATS:
+            return Response(
+                f"Формат {file_format} не поддерживается",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not user.shopping_list.exists():
             return Response(
                 "В корзине нет товаров", status=status.HTTP_400_BAD_REQUEST
             )
 
-        text = "Список покупок:\n\n"
-        ingredient_name = "recipe__recipe__ingredient__name"
-        ingredient_unit = "recipe__recipe__ingredient__measurement_unit"
-        recipe_amount = "recipe__recipe__amount"
-        amount_sum = "recipe__recipe__amount__sum"
-        cart = (
-            user.shopping_cart.select_related("recipe")
-            .values(ingredient_name, ingredient_unit)
-            .annotate(Sum(recipe_amount))
-            .order_by(ingredient_name)
+        cart = user.shopping_list.values(
+            shopping_list.NAME, shopping_list.UNIT, shopping_list.AMOUNT
+        ).order_by(shopping_list.NAME)
+        rows, content_type = shopping_list.FORMATS[file_format]
+        # Под ASGI тело ответа перебирается в цикле событий, где обращаться
+        # к БД нельзя, поэтому строки читаются здесь. Список покупок не
+        # длиннее каталога ингредиентов.
+        response = StreamingHttpResponse(
+            rows(list(cart)), content_type=content_type
         )
-        for _ in cart:
-            text += (
-                f"{_[ingredient_name]} ({_[ingredient_unit]})"
-                f" — {_[amount_sum]}\n"
-            )
-        response = HttpResponse(text, content_type="text/plain")
-        filename = "shopping_list.txt"
+        filename = f"shopping_list.{file_format}"
         response["Content-Disposition"] = f"attachment; filename={filename}"
         return response
 
@@ -79,6 +235,17 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
     filterset_class = IngredientFilter
 
+    @versioned(lambda request, **kwargs: ("ingredients",))
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if name:
+            return Response(ingredient_index.search(name))
+        return super().list(request, *args, **kwargs)
+
+    @versioned(lambda request, **kwargs: ("ingredients",))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
@@ -86,6 +253,14 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
 
+    @versioned(lambda request, **kwargs: ("tags",))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @versioned(lambda request, **kwargs: ("tags",))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
 class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
@@ -103,14 +278,25 @@ class CustomUserViewSet(UserViewSet):
             self.permission_classes = [IsAuthenticated]
         return super().get_permissions()
 
+    def get_instance(self):
+        # У пользователя из кэша токенов загружены только id и is_active.
+        return User.objects.get(pk=self.request.user.pk)
+
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
-        queryset = Subscribe.objects.filter(user=request.user)
+        queryset = (
+            Subscribe.objects.filter(user=request.user)
+            .select_related("author")
+        )
         pages = self.paginate_queryset(queryset)
+        latest_recipes = Recipe.objects.latest_by_authors(
+            [subscribe.author_id for subscribe in pages],
+            get_recipes_limit(request),
+        )
         serializer = SubscribeSerializer(
             pages,
             many=True,
-            context={"request": request},
+            context={"request": request, "latest_recipes": latest_recipes},
         )
         return self.get_paginated_response(serializer.data)
 
@@ -198,6 +384,7 @@ class ShoppingCartViewSet(CreateDestroyViewSet):
         context["recipe_id"] = self.kwargs.get("recipe_id")
         return context
 
+    @transaction.atomic
     def perform_create(self, serializer):
         serializer.save(
             user=self.request.user,
@@ -205,6 +392,7 @@ class ShoppingCartViewSet(CreateDestroyViewSet):
         )
 
     @action(methods=("delete",), detail=True)
+    @transaction.atomic
     def delete(self, request, recipe_id):
         request_user = request.user
         if (
@@ -0,0 +1,161 @@
+"""Пропускная способность GET-запросов API под WSGI и под ASGI.
+
+Запускает gunicorn с синхронными воркерами (foodgram.wsgi) и с воркерами
+uvicorn (foodgram.asgi) с синхронными и с асинхронными view на одной и той
+же БД и держит заданное число одновременных соединений.
+
+    python -m benchmarks.async_reads --concurrency 200 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from statistics import quantiles
+from urllib.parse import quote
+
+ASGI = [
+    "foodgram.asgi:application",
+    "--worker-class",
+    "uvicorn.workers.UvicornWorker",
+]
+SERVERS = {
+    "wsgi": (["foodgram.wsgi:application"], {}),
+    "asgi-sync": (ASGI, {"ASYNC_READ_VIEWS": "0"}),
+    "asgi": (ASGI, {"ASYNC_READ_VIEWS": "1"}),
+}
+URLS = (
+    "/api/recipes/",
+    "/api/recipes/?page=2",
+    "/api/tags/",
+    f"/api/ingredients/?name={quote('мол')}",
+)
+
+
+def start(name, port, workers):
+    args, env = SERVERS[name]
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            *args,
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, **env},
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{name}: сервер не запустился")
+
+
+async def request(port, path, headers, connection):
+    """Один запрос; соединение переиспользуется, пока сервер не закроет."""
+    if connection is None:
+        connection = await asyncio.open_connection("127.0.0.1", port)
+    reader, writer = connection
+    writer.write(
+        f"GET {path} HTTP/1.1\r\nHost: localhost\r\n{headers}\r\n".encode()
+    )
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length, keep_alive = 0, True
+    for line in head.decode("latin1").lower().split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name == "content-length":
+            length = int(value)
+        if name == "connection" and value.strip() == "close":
+            keep_alive = False
+    await reader.readexactly(length)
+    if not keep_alive:
+        writer.close()
+        connection = None
+    return status, connection
+
+
+async def client(port, headers, stop_at, stats):
+    connection, number = None, 0
+    while time.monotonic() < stop_at:
+        path = URLS[number % len(URLS)]
+        number += 1
+        started = time.monotonic()
+        try:
+            status, connection = await request(
+                port, path, headers, connection
+            )
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats["errors"] += 1
+            connection = None
+            continue
+        stats["latencies"].append(time.monotonic() - started)
+        if status != 200:
+            stats["errors"] += 1
+    if connection is not None:
+        connection[1].close()
+
+
+async def load(port, concurrency, duration, token):
+    headers = f"Authorization: Token {token}\r\n" if token else ""
+    stats = {"latencies": [], "errors": 0}
+    stop_at = time.monotonic() + duration
+    await asyncio.gather(
+        *(
+            client(port, headers, stop_at, stats)
+            for _ in range(concurrency)
+        )
+    )
+    return stats
+
+
+def report(name, stats, duration):
+    latencies = stats["latencies"]
+    if len(latencies) < 2:
+        print(f"{name}: нет успешных ответов, ошибок {stats['errors']}")
+        return
+    percentiles = quantiles(latencies, n=100)
+    print(
+        f"{name}: {len(latencies) / duration:.0f} запросов/с, "
+        f"p50 {percentiles[49] * 1000:.0f} мс, "
+        f"p99 {percentiles[98] * 1000:.0f} мс, "
+        f"ошибок {stats['errors']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", help="Токен пользователя для запросов")
+    args = parser.parse_args()
+    for name in SERVERS:
+        process = start(name, args.port, args.workers)
+        try:
+            asyncio.run(load(args.port, 10, 2, args.token))
+            stats = asyncio.run(
+                load(args.port, args.concurrency, args.duration, args.token)
+            )
+        finally:
+            process.terminate()
+            process.wait()
+        report(name, stats, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Пиковая память (RSS) на одну загрузку изображения рецепта.
+
+Сравнивает декодирование всей строки base64 в памяти с проверкой по
+заголовку и декодированием кусками во временный файл. Каждый замер
+выполняется в отдельном процессе.
+
+    python -m benchmarks.image_upload --width 4000 --height 3000
+"""
+import argparse
+import base64
+import multiprocessing
+import os
+import resource
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+
+
+def make_payload(width, height, image_format):
+    from PIL import Image
+
+    buffer = BytesIO()
+    Image.effect_noise((width, height), 64).convert("RGB").save(
+        buffer, image_format
+    )
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def in_memory(payload):
+    from PIL import Image
+
+    data = base64.b64decode(payload)
+    with Image.open(BytesIO(data)) as image:
+        image.load()
+
+
+def chunked(payload):
+    from PIL import Image
+
+    from recipes.images import check_base64_image, decode_to_file
+
+    check_base64_image(payload)
+    path = decode_to_file(payload)
+    try:
+        with Image.open(path) as image:
+            image.load()
+    finally:
+        os.remove(path)
+
+
+def measure(name, payload_path, queue):
+    import django
+
+    django.setup()
+    with open(payload_path) as file:
+        payload = file.read()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        globals()[name](payload)
+    except Exception as error:
+        queue.put(f"отклонено: {error}")
+        return
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put(f"прирост пикового RSS {(after - before) / 1024:.1f} МБ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--format", default="JPEG")
+    args = parser.parse_args()
+    payload = make_payload(args.width, args.height, args.format)
+    print(f"base64: {len(payload) / 2 ** 20:.1f} МБ")
+    context = multiprocessing.get_context("spawn")
+    with NamedTemporaryFile("w", suffix=".b64") as file:
+        file.write(payload)
+        file.flush()
+        del payload
+        for name in ("in_memory", "chunked"):
+            queue = context.Queue()
+            process = context.Process(
+                target=measure, args=(name, file.name, queue)
+            )
+            process.start()
+            process.join()
+            result = queue.get() if not queue.empty() else "процесс упал"
+            print(f"{name:>10}: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""Задержка, число запросов к БД и пиковая память по всем эндпоинтам API.
+
+Сценарии выполняются в процессе через тестовый клиент на данных из
+generate_data; каждый запрос откатывается, поэтому прогоны повторяемы.
+
+    python manage.py generate_data --users 1000 --recipes 5000
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from collections import namedtuple
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
+
+PNG = (
+    "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA"
+    "DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=="
+)
+
+Scenario = namedtuple(
+    "Scenario", ("name", "method", "path", "data", "auth"), defaults=(None, 1)
+)
+
+
+def fixture(prefix):
+    """Пользователь и объекты, на которых выполняются сценарии.
+
+    Берется самый активный автор из generate_data: у него есть рецепты,
+    подписки, избранное и корзина.
+    """
+    from rest_framework.authtoken.models import Token
+
+    from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                                ShoppingCart, Subscribe, Tag, User)
+
+    users = User.objects.filter(username__startswith=prefix)
+    user = users.order_by("-recipes_count", "id").first()
+    if user is None:
+        sys.exit(f"Нет пользователей {prefix}*, запустите generate_data")
+    favorites = FavoriteRecipe.objects.filter(user=user)
+    cart = ShoppingCart.objects.filter(user=user)
+    subscription = Subscribe.objects.filter(user=user).first()
+    recipes = Recipe.objects.exclude(author=user).order_by("-favorites_count")
+    return {
+        "user": user,
+        "token": Token.objects.get_or_create(user=user)[0].key,
+        "author": users.exclude(pk=user.pk).order_by("-recipes_count")[0],
+        "stranger": users.exclude(pk=user.pk)
+        .exclude(following__user=user)
+        .first(),
+        "subscription": subscription,
+        "own_recipe": Recipe.objects.filter(author=user).first(),
+        "recipe": recipes.first(),
+        "new_recipes": list(
+            recipes.exclude(favorite_recipe__user=user)
+            .exclude(recipe_shopping_cart__user=user)
+            .values_list("id", flat=True)[:10]
+        ),
+        "favorite": favorites.first(),
+        "cart": cart.first(),
+        "tags": list(Tag.objects.values_list("id", flat=True)[:2]),
+        "tag_slug": Tag.objects.values_list("slug", flat=True)[0],
+        "ingredients": list(
+            Ingredient.objects.values_list("id", flat=True)[:10]
+        ),
+    }
+
+
+def recipe_data(f, name):
+    return {
+        "name": name,
+        "text": "Описание рецепта для нагрузочного теста",
+        "cooking_time": 30,
+        "image": PNG,
+        "tags": f["tags"],
+        "ingredients": [
+            {"id": ingredient_id, "amount": 10 * number}
+            for number, ingredient_id in enumerate(f["ingredients"], 1)
+        ],
+    }
+
+
+def scenarios(f):
+    from recipes.management.commands.generate_data import PASSWORD
+
+    user, author, own = f["user"], f["author"], f["own_recipe"]
+    recipe, new_ids = f["recipe"], f["new_recipes"]
+    favorite, cart = f["favorite"], f["cart"]
+    stranger, subscription = f["stranger"], f["subscription"]
+    tag, slug, ingredient = f["tags"][0], f["tag_slug"], f["ingredients"][0]
+    return (
+        Scenario("api root", "get", "/api/"),
+        Scenario(
+            "login",
+            "post",
+            "/api/auth/token/login/",
+            {"email": user.email, "password": PASSWORD},
+            auth=False,
+        ),
+        Scenario("logout", "post", "/api/auth/token/logout/"),
+        Scenario("users", "get", "/api/users/"),
+        Scenario("users page 5", "get", "/api/users/?page=5"),
+        Scenario("user", "get", f"/api/users/{author.pk}/"),
+        Scenario("me", "get", "/api/users/me/"),
+        Scenario(
+            "me patch",
+            "patch",
+            "/api/users/me/",
+            {"first_name": "Новое имя"},
+        ),
+        Scenario(
+            "user patch",
+            "patch",
+            f"/api/users/{user.pk}/",
+            {"last_name": "Новая фамилия"},
+        ),
+        Scenario(
+            "user delete",
+            "delete",
+            f"/api/users/{user.pk}/",
+            {"current_password": PASSWORD},
+        ),
+        Scenario(
+            "sign up",
+            "post",
+            "/api/users/",
+            {
+                "email": "bench-new@example.com",
+                "username": "bench-new",
+                "first_name": "Имя",
+                "last_name": "Фамилия",
+                "password": PASSWORD,
+            },
+            auth=False,
+        ),
+        Scenario(
+            "set password",
+            "post",
+            "/api/users/set_password/",
+            {
+                "current_password": PASSWORD,
+                "new_password": "another-bench-password",
+            },
+        ),
+        Scenario("subscriptions", "get", "/api/users/subscriptions/"),
+        Scenario(
+            "subscriptions limit",
+            "get",
+            "/api/users/subscriptions/?recipes_limit=3&page=2",
+        ),
+        Scenario("subscribe", "post", f"/api/users/{stranger.pk}/subscribe/"),
+        Scenario(
+            "unsubscribe",
+            "delete",
+            f"/api/users/{subscription.author_id}/subscribe/"
+            f"{subscription.pk}/",
+        ),
+        Scenario(
+            "unsubscribe delete",
+            "delete",
+            f"/api/users/{subscription.author_id}/subscribe/"
+            f"{subscription.pk}/delete/",
+        ),
+        Scenario("recipes", "get", "/api/recipes/"),
+        Scenario("recipes anonymous", "get", "/api/recipes/", auth=False),
+        Scenario("recipes page 50", "get", "/api/recipes/?page=50"),
+        Scenario(
+            "recipes cursor",
+            "get",
+            "/api/recipes/?pagination=cursor&limit=6",
+        ),
+        Scenario("recipes by tag", "get", f"/api/recipes/?tags={slug}"),
+        Scenario(
+            "recipes by author", "get", f"/api/recipes/?author={author.pk}"
+        ),
+        Scenario("recipes favorited", "get", "/api/recipes/?is_favorited=1"),
+        Scenario(
+            "recipes in cart", "get", "/api/recipes/?is_in_shopping_cart=1"
+        ),
+        Scenario("recipes search", "get", "/api/recipes/?search=курица"),
+        Scenario("recipe", "get", f"/api/recipes/{recipe.pk}/"),
+        Scenario(
+            "recipe create",
+            "post",
+            "/api/recipes/",
+            recipe_data(f, "Рецепт нагрузочного теста"),
+        ),
+        Scenario(
+            "recipe update",
+            "put",
+            f"/api/recipes/{own.pk}/",
+            recipe_data(f, own.name),
+        ),
+        Scenario(
+            "recipe patch",
+            "patch",
+            f"/api/recipes/{own.pk}/",
+            {"cooking_time": 45},
+        ),
+        Scenario("recipe delete", "delete", f"/api/recipes/{own.pk}/"),
+        Scenario("feed", "get", "/api/recipes/feed/"),
+        Scenario(
+            "shopping list txt", "get", "/api/recipes/download_shopping_cart/"
+        ),
+        Scenario(
+            "shopping list pdf",
+            "get",
+            "/api/recipes/download_shopping_cart/?file_format=pdf",
+        ),
+        Scenario("favorite", "post", f"/api/recipes/{new_ids[0]}/favorite/"),
+        Scenario(
+            "unfavorite",
+            "delete",
+            f"/api/recipes/{favorite.favorite_recipe_id}/favorite/"
+            f"{favorite.pk}/",
+        ),
+        Scenario(
+            "unfavorite delete",
+            "delete",
+            f"/api/recipes/{favorite.favorite_recipe_id}/favorite/"
+            f"{favorite.pk}/delete/",
+        ),
+        Scenario(
+            "favorite many",
+            "post",
+            "/api/recipes/favorite/",
+            {
+                "recipes": new_ids,
+            },
+        ),
+        Scenario(
+            "unfavorite many",
+            "delete",
+            "/api/recipes/favorite/",
+            {
+                "recipes": [favorite.favorite_recipe_id, *new_ids],
+            },
+        ),
+        Scenario(
+            "to cart", "post", f"/api/recipes/{new_ids[0]}/shopping_cart/"
+        ),
+        Scenario(
+            "from cart",
+            "delete",
+            f"/api/recipes/{cart.recipe_id}/shopping_cart/{cart.pk}/",
+        ),
+        Scenario(
+            "from cart delete",
+            "delete",
+            f"/api/recipes/{cart.recipe_id}/shopping_cart/{cart.pk}/delete/",
+        ),
+        Scenario(
+            "to cart many",
+            "post",
+            "/api/recipes/shopping_cart/",
+            {
+                "recipes": new_ids,
+            },
+        ),
+        Scenario(
+            "from cart many",
+            "delete",
+            "/api/recipes/shopping_cart/",
+            {
+                "recipes": [cart.recipe_id, *new_ids],
+            },
+        ),
+        Scenario("ingredients", "get", "/api/ingredients/"),
+        Scenario("ingredients search", "get", "/api/ingredients/?name=мол"),
+        Scenario("ingredient", "get", f"/api/ingredients/{ingredient}/"),
+        Scenario("tags", "get", "/api/tags/"),
+        Scenario("tag", "get", f"/api/tags/{tag}/"),
+    )
+
+
+def api_views():
+    """ViewSet.action и методы всех доступных маршрутов api/urls.py."""
+    from django.urls import URLResolver
+
+    from api.urls import urlpatterns
+
+    def walk(patterns, prefix=""):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(
+                    pattern.url_patterns, prefix + str(pattern.pattern)
+                )
+                continue
+            cls = pattern.callback.cls
+            actions = getattr(pattern.callback, "actions", None) or {
+                method: method
+                for method in cls.http_method_names
+                if method not in ("head", "options") and hasattr(cls, method)
+            }
+            for method, action in actions.items():
+                yield (prefix + str(pattern.pattern), method), (
+                    f"{cls.__name__}.{action}"
+                )
+
+    views = {}
+    for route, name in walk(urlpatterns):
+        views.setdefault(route, name)
+    return set(views.values())
+
+
+def run(client, scenario):
+    response = getattr(client, scenario.method)(
+        scenario.path, data=scenario.data, format="json"
+    )
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
+
+
+def measure(clients, scenario, repeat):
+    """Запросы выполняются в транзакции, которая затем откатывается."""
+    from django.db import connection, transaction
+    from django.test.utils import CaptureQueriesContext
+
+    from foodgram.metrics import view_name
+
+    client = clients[scenario.auth]
+    latencies, queries, statuses = [], [], set()
+    # Первый прогон прогревает кэши, последний - только для tracemalloc.
+    for number in range(repeat + 2):
+        with transaction.atomic():
+            if number == repeat + 1:
+                tracemalloc.start()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = run(client, scenario)
+                elapsed = time.perf_counter() - started
+            if number == repeat + 1:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            transaction.set_rollback(True)
+        if 0 < number <= repeat:
+            latencies.append(elapsed)
+            queries.append(len(context))
+            statuses.add(response.status_code)
+    percentiles = quantiles(latencies, n=100)
+    return view_name(response.wsgi_request), {
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p95_ms": round(percentiles[94] * 1000, 2),
+        "queries": max(queries),
+        "peak_kib": round(peak / 1024),
+        "status": sorted(statuses),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Строки с ростом p95 или памяти больше threshold % и числа запросов."""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        for key in ("p95_ms", "peak_kib"):
+            if result[key] > old[key] * (1 + threshold / 100):
+                regressions.append(
+                    f"{name}: {key} {old[key]} -> {result[key]}"
+                )
+        if result["queries"] > old["queries"]:
+            regressions.append(
+                f"{name}: queries {old['queries']} -> {result['queries']}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument(
+        "--prefix", default="bench0_", help="Пользователи из generate_data"
+    )
+    parser.add_argument("--only", help="Только сценарии с этой подстрокой")
+    parser.add_argument("--save", help="Сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="Сравнить с сохраненным JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=20,
+        help="Допустимый рост p95 и памяти, %%",
+    )
+    args = parser.parse_args()
+    if args.repeat < 2:
+        parser.error("--repeat должен быть не меньше 2")
+
+    import django
+
+    django.setup()
+    from django.test.utils import override_settings
+    from rest_framework.test import APIClient
+
+    f = fixture(args.prefix)
+    clients = {
+        auth: APIClient(raise_request_exception=False) for auth in (0, 1)
+    }
+    clients[1].credentials(HTTP_AUTHORIZATION=f"Token {f['token']}")
+    results, covered = {}, set()
+    print(
+        f"{'сценарий':<24}{'p50 мс':>9}{'p95 мс':>9}{'SQL':>5}"
+        f"{'пик КиБ':>9}  статус"
+    )
+    with TemporaryDirectory() as media_root:
+        with override_settings(MEDIA_ROOT=media_root, ALLOWED_HOSTS=["*"]):
+            for scenario in scenarios(f):
+                if args.only and args.only not in scenario.name:
+                    continue
+                view, result = measure(clients, scenario, args.repeat)
+                covered.add(view)
+                results[scenario.name] = result
+                print(
+                    f"{scenario.name:<24}{result['p50_ms']:>9.1f}"
+                    f"{result['p95_ms']:>9.1f}{result['queries']:>5}"
+                    f"{result['peak_kib']:>9}  "
+                    f"{','.join(map(str, result['status']))}"
+                )
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Пиковый RSS процесса: {maxrss:.0f} МБ")
+    if not args.only:
+        missing = sorted(api_views() - covered)
+        if missing:
+            print("Без сценария:", ", ".join(missing))
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            print("Ухудшения относительно эталона:")
+            print("\n".join(f"  {line}" for line in regressions))
+            sys.exit(1)
+        print("Ухудшений относительно эталона нет")
+
+
+if __name__ == "__main__":
+    main()
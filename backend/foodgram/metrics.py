@@ -0,0 +1,158 @@
+import os
+import time
+from asyncio import iscoroutinefunction
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.decorators import sync_and_async_middleware
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+from .profiling import (current_profile, record_queries, start_profile,
+                        stop_profile)
+
+# При заданном PROMETHEUS_MULTIPROC_DIR значения пишутся в файлы этого
+# каталога, и /metrics/ собирает их со всех воркеров gunicorn.
+REQUEST_DURATION = Histogram(
+    "foodgram_request_duration_seconds",
+    "Время обработки запроса",
+    ("view", "method", "status"),
+)
+REQUEST_DB_DURATION = Histogram(
+    "foodgram_request_db_seconds",
+    "Время запросов к БД за один HTTP-запрос",
+    ("view",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+REQUEST_QUERIES = Histogram(
+    "foodgram_request_queries",
+    "Число запросов к БД за один HTTP-запрос",
+    ("view",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+RESPONSE_SIZE = Histogram(
+    "foodgram_response_size_bytes",
+    "Размер тела ответа",
+    ("view",),
+    buckets=tuple(2 ** power for power in range(8, 24, 2)),
+)
+CACHE_REQUESTS = Counter(
+    "foodgram_cache_requests_total",
+    "Обращения к кэшам: попадания и промахи",
+    ("cache", "result"),
+)
+
+
+def count_cache(cache, hits, misses):
+    if hits:
+        CACHE_REQUESTS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, "miss").inc(misses)
+
+
+def view_name(request):
+    """ViewSet.action для DRF, имя URL для остальных представлений."""
+    match = request.resolver_match
+    if match is None:
+        return "unmatched"
+    cls = getattr(match.func, "cls", None)
+    if cls is None:
+        return match.view_name
+    method = request.method.lower()
+    action = (getattr(match.func, "actions", None) or {}).get(method, method)
+    return f"{cls.__name__}.{action}"
+
+
+def streamed(chunks, profile, done):
+    """Отдает тело ответа под профилем запроса и вызывает done в конце.
+
+    Запросы к БД при переборе тела попадают в профиль, а время запроса
+    включает отдачу тела.
+    """
+    chunks = iter(chunks)
+    size = 0
+    try:
+        while True:
+            token = current_profile.set(profile)
+            try:
+                chunk = next(chunks, None)
+            finally:
+                current_profile.reset(token)
+            if chunk is None:
+                return
+            size += len(chunk)
+            yield chunk
+    finally:
+        done(size)
+
+
+def observe(request, response, profile, started):
+    view = view_name(request)
+
+    def record(size):
+        REQUEST_DURATION.labels(
+            view, request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+        REQUEST_DB_DURATION.labels(view).observe(profile.duration)
+        REQUEST_QUERIES.labels(view).observe(profile.count)
+        RESPONSE_SIZE.labels(view).observe(size)
+
+    if response.streaming:
+        response.streaming_content = streamed(
+            response.streaming_content, profile, record
+        )
+    else:
+        record(len(response.content))
+    if response.has_header("ETag"):
+        count_cache(
+            "conditional",
+            response.status_code == 304,
+            response.status_code != 304,
+        )
+    return response
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Время, запросы к БД и размер ответа по представлениям DRF."""
+
+    if not settings.METRICS:
+        return get_response
+
+    record_queries()
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            started = time.perf_counter()
+            profile, token = start_profile()
+            try:
+                response = await get_response(request)
+            finally:
+                stop_profile(token)
+            return observe(request, response, profile, started)
+
+    else:
+
+        def middleware(request):
+            started = time.perf_counter()
+            profile, token = start_profile()
+            try:
+                response = get_response(request)
+            finally:
+                stop_profile(token)
+            return observe(request, response, profile, started)
+
+    return middleware
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus."""
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,156 @@
+import json
+import logging
+import re
+import time
+from asyncio import iscoroutinefunction
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+current_profile = ContextVar("current_profile", default=None)
+
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"(?:%s|\?)(?:\s*,\s*(?:%s|\?))+"), "?, ..."),
+    (re.compile(r"\s+"), " "),
+)
+
+
+def normalize_sql(sql):
+    """Форма запроса: без литералов и с одинаковыми списками IN."""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class SQLProfile:
+    """Запросы к БД за время одного HTTP-запроса."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def add(self, sql, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[normalize_sql(sql)] += 1
+
+    def repeated(self, threshold):
+        return [
+            {"sql": sql, "count": count}
+            for sql, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.duration * 1000:.1f};desc="queries: {self.count}"'
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add(sql, time.perf_counter() - started)
+
+
+def install_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_queries():
+    """Включает запись запросов на всех соединениях с БД."""
+    connection_created.connect(install_wrapper, dispatch_uid=__name__)
+    for connection in connections.all(initialized_only=True):
+        install_wrapper(None, connection)
+
+
+def start_profile():
+    """Профиль текущего запроса; внешний middleware делится своим."""
+    profile = current_profile.get()
+    if profile is not None:
+        return profile, None
+    profile = SQLProfile()
+    return profile, current_profile.set(profile)
+
+
+def stop_profile(token):
+    if token is not None:
+        current_profile.reset(token)
+
+
+def finish(request, response, profile, started):
+    total = time.perf_counter() - started
+    threshold = settings.SQL_PROFILER_N_PLUS_ONE_THRESHOLD
+    repeated = profile.repeated(threshold)
+    response["Server-Timing"] = ", ".join(
+        (profile.server_timing(), f"total;dur={total * 1000:.1f}")
+    )
+    logger.log(
+        logging.WARNING if repeated else logging.INFO,
+        json.dumps(
+            {
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "queries": profile.count,
+                "db_ms": round(profile.duration * 1000, 1),
+                "total_ms": round(total * 1000, 1),
+                "n_plus_one": repeated,
+            },
+            ensure_ascii=False,
+        ),
+    )
+    return response
+
+
+@sync_and_async_middleware
+def sql_profiler_middleware(get_response):
+    """Число и время запросов к БД и повторяющиеся запросы (N+1).
+
+    Включается настройкой SQL_PROFILER; пишет заголовок Server-Timing и
+    строку JSON в лог foodgram.profiling.
+    """
+
+    if not settings.SQL_PROFILER:
+        return get_response
+
+    record_queries()
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            started = time.perf_counter()
+            profile, token = start_profile()
+            try:
+                response = await get_response(request)
+            finally:
+                stop_profile(token)
+            return finish(request, response, profile, started)
+
+    else:
+
+        def middleware(request):
+            started = time.perf_counter()
+            profile, token = start_profile()
+            try:
+                response = get_response(request)
+            finally:
+                stop_profile(token)
+            return finish(request, response, profile, started)
+
+    return middleware
@@ -0,0 +1,111 @@
+import random
+from asyncio import iscoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.decorators import sync_and_async_middleware
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Токены только что вошедших пользователей могут еще не дойти до реплик.
+PRIMARY_APPS = ("authtoken",)
+
+use_replica = ContextVar("use_replica", default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != "default"]
+
+
+@contextmanager
+def primary_reads():
+    """Чтение внутри блока идет на primary и в безопасных запросах."""
+    token = use_replica.set(False)
+    try:
+        yield
+    finally:
+        use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение в безопасных запросах идет на реплики, запись на primary."""
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if (
+            replicas
+            and use_replica.get()
+            and model._meta.app_label not in PRIMARY_APPS
+        ):
+            return random.choice(replicas)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
+
+
+def pin_keys(request):
+    """Ключи клиента по заголовку Authorization и cookie сессии."""
+    values = (
+        request.META.get("HTTP_AUTHORIZATION"),
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME),
+    )
+    return [
+        "db-pin:" + sha256(value.encode()).hexdigest()
+        for value in values
+        if value
+    ]
+
+
+@sync_and_async_middleware
+def replica_middleware(get_response):
+    """Закрепляет клиента за primary на время после его записи.
+
+    Так клиент сразу видит свои изменения, даже если реплика отстает.
+    Работает и под WSGI, и под ASGI без перехода в синхронный поток.
+    """
+
+    if not replica_aliases():
+        return get_response
+
+    def pin(keys):
+        return dict.fromkeys(keys, True), settings.REPLICA_PIN_SECONDS
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            keys = pin_keys(request)
+            safe = request.method in SAFE_METHODS
+            pinned = await cache.aget_many(keys)
+            token = use_replica.set(safe and not pinned)
+            try:
+                response = await get_response(request)
+            finally:
+                use_replica.reset(token)
+            if not safe:
+                await cache.aset_many(*pin(keys))
+            return response
+
+    else:
+
+        def middleware(request):
+            keys = pin_keys(request)
+            safe = request.method in SAFE_METHODS
+            token = use_replica.set(safe and not cache.get_many(keys))
+            try:
+                response = get_response(request)
+            finally:
+                use_replica.reset(token)
+            if not safe:
+                cache.set_many(*pin(keys))
+            return response
+
+    return middleware
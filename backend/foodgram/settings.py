@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "djoser",
     "rest_framework",
     "rest_framework.authtoken",
@@ -33,7 +34,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "foodgram.metrics.metrics_middleware",
     "django.middleware.security.SecurityMiddleware",
+    "foodgram.profiling.sql_profiler_middleware",
+    "foodgram.replicas.replica_middleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -61,6 +65,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "foodgram.wsgi.application"
+ASGI_APPLICATION = "foodgram.asgi.application"
+
+# Включается в foodgram/asgi.py: под WSGI асинхронные view только мешают.
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", default="0") == "1"
 
 
 DATABASES = {
@@ -76,6 +84,57 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: хосты через запятую, остальные параметры как у default.
+DB_REPLICA_HOSTS = [
+    host for host in os.getenv("DB_REPLICA_HOSTS", default="").split(",")
+    if host
+]
+for number, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES[f"replica_{number}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["foodgram.replicas.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", default=5))
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default=""),
+    }
+}
+
+RECIPE_CACHE_ALIAS = "default"
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", default=3600))
+
+SQL_PROFILER = os.getenv("SQL_PROFILER", default="0") == "1"
+SQL_PROFILER_N_PLUS_ONE_THRESHOLD = int(
+    os.getenv("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", default=5)
+)
+
+# Метрики Prometheus на /metrics/; для нескольких воркеров gunicorn нужен
+# общий каталог PROMETHEUS_MULTIPROC_DIR (см. gunicorn.conf.py).
+METRICS = os.getenv("METRICS", default="0") == "1"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "foodgram.profiling": {"handlers": ["console"], "level": "INFO"},
+    },
+}
+
+AUTH_TOKEN_CACHE_ALIAS = "default"
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv("AUTH_TOKEN_CACHE_TIMEOUT", default=60)
+)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -120,6 +179,24 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+RECIPE_IMAGE_PLACEHOLDER = "recipes/placeholder.png"
+RECIPE_IMAGE_SIZE = (1280, 1280)
+RECIPE_THUMBNAIL_SIZE = (480, 480)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", default=2))
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv("IMAGE_UPLOAD_MAX_SIZE", default=10 * 2 ** 20)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.getenv("IMAGE_UPLOAD_MAX_PIXELS", default=25 * 10 ** 6)
+)
+
+FEED_WORKERS = int(os.getenv("FEED_WORKERS", default=1))
+
+PDF_FONT_PATH = os.getenv(
+    "PDF_FONT_PATH",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
@@ -129,7 +206,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": (
         "rest_framework.pagination.PageNumberPagination"),
@@ -0,0 +1,5 @@
+class Echo:
+    """Буфер для csv.writer, который сразу отдает записанную строку."""
+
+    def write(self, value):
+        return value
@@ -1,9 +1,9 @@
 from django.contrib.admin import ModelAdmin, TabularInline, register, site
-from django.db.models import Count
 from django.utils.safestring import mark_safe
 
-from .models import (FavoriteRecipe, Ingredient, IngredientAmount, Recipe,
-                     ShoppingCart, Subscribe, Tag)
+from .models import (FavoriteRecipe, FeedItem, Ingredient, IngredientAmount,
+                     Recipe, ShoppingCart, ShoppingListIngredient, Subscribe,
+                     Tag, recipe_amounts)
 
 site.site_header = "Администрирование Foodgram"
 EMPTY_VALUE_DISPLAY = "Значение не указано"
@@ -23,6 +23,17 @@ class IngredientAmount(ModelAdmin):
     list_filter = ("id", "recipe", "ingredient")
     empy_value_display = EMPTY_VALUE_DISPLAY
 
+    # Количества меняются только вместе с рецептом: иначе итоги в списках
+    # покупок (ShoppingListIngredient) разойдутся с рецептами.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @register(FavoriteRecipe)
 class FavoriteAdmin(ModelAdmin):
@@ -57,7 +68,7 @@ class RecipeAdmin(ModelAdmin):
         "text",
         "get_image",
         "pub_date",
-        "favorite_count",
+        "favorites_count",
     )
     fields = (
         (
@@ -84,14 +95,15 @@ class RecipeAdmin(ModelAdmin):
 
     get_image.short_description = "Изображение"
 
-    def favorite_count(self, obj):
-        return obj.obj_count
-
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(
-            obj_count=Count("favorite_recipe", distinct=True),
-        )
+    def save_related(self, request, form, formsets, change):
+        old_amounts = recipe_amounts(form.instance.pk) if change else {}
+        super().save_related(request, form, formsets, change)
+        if change:
+            ShoppingListIngredient.objects.change_recipe(
+                form.instance.pk,
+                old_amounts,
+                recipe_amounts(form.instance.pk),
+            )
 
 
 @register(Subscribe)
@@ -108,3 +120,19 @@ class ShoppingCartAdmin(ModelAdmin):
     search_fields = ("user", "recipe")
     list_filter = ("user", "recipe")
     empy_value_display = EMPTY_VALUE_DISPLAY
+
+
+@register(ShoppingListIngredient)
+class ShoppingListIngredientAdmin(ModelAdmin):
+    list_display = ("id", "user", "ingredient", "amount")
+    search_fields = ("user__username", "ingredient__name")
+    list_filter = ("user",)
+    empty_value_display = EMPTY_VALUE_DISPLAY
+
+
+@register(FeedItem)
+class FeedItemAdmin(ModelAdmin):
+    list_display = ("id", "user", "recipe", "pub_date")
+    search_fields = ("user__username", "recipe__name")
+    list_filter = ("user",)
+    empty_value_display = EMPTY_VALUE_DISPLAY
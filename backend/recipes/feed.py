@@ -0,0 +1,46 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .models import FeedItem
+
+logger = logging.getLogger(__name__)
+
+executor = (
+    ThreadPoolExecutor(
+        max_workers=settings.FEED_WORKERS,
+        thread_name_prefix="recipe-feed",
+    )
+    if settings.FEED_WORKERS
+    else None
+)
+
+
+def fan_out(recipe_id):
+    try:
+        FeedItem.objects.fan_out(recipe_id)
+    except Exception:
+        logger.exception("Не удалось разослать рецепт %s в ленты", recipe_id)
+
+
+def fan_out_in_worker(recipe_id):
+    try:
+        fan_out(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_fan_out(recipe_id):
+    """Рассылает новый рецепт подписчикам после коммита транзакции.
+
+    Задачи в потоках не переживают перезапуск процесса: пропущенные
+    рецепты добавляет команда repair_feeds.
+    """
+    if executor is None:
+        transaction.on_commit(lambda: fan_out(recipe_id))
+    else:
+        transaction.on_commit(
+            lambda: executor.submit(fan_out_in_worker, recipe_id)
+        )
@@ -0,0 +1,276 @@
+import logging
+import os
+from base64 import b64decode
+from binascii import Error as BinasciiError
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from tempfile import NamedTemporaryFile
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageFile, ImageOps, UnidentifiedImageError
+
+from .models import Recipe
+
+# Размеры в символах base64; кратны 4, чтобы куски декодировались отдельно.
+CHUNK_SIZE = 64 * 1024
+HEADER_SIZE = 256 * 1024
+VARIANTS = ("image", "image_webp", "thumbnail")
+UPLOAD_DIR = Recipe._meta.get_field("image_source").upload_to
+
+logger = logging.getLogger(__name__)
+
+executor = (
+    ThreadPoolExecutor(
+        max_workers=settings.IMAGE_WORKERS,
+        thread_name_prefix="recipe-images",
+    )
+    if settings.IMAGE_WORKERS
+    else None
+)
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def chunks(payload, limit=None):
+    end = len(payload) if limit is None else min(len(payload), limit)
+    for start in range(0, end, CHUNK_SIZE):
+        try:
+            yield b64decode(payload[start:start + CHUNK_SIZE], validate=True)
+        except BinasciiError:
+            raise InvalidImage("Некорректные данные base64")
+
+
+def check_base64_image(payload):
+    """Проверяет размер и число пикселей, не декодируя изображение целиком.
+
+    Размер файла вычисляется по длине base64, размеры в пикселях — по
+    заголовку из первых HEADER_SIZE символов.
+    """
+    if not payload or len(payload) % 4:
+        raise InvalidImage("Некорректные данные base64")
+    size = len(payload) // 4 * 3 - payload[-2:].count("=")
+    if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ImageTooLarge(
+            "Размер изображения больше "
+            f"{settings.IMAGE_UPLOAD_MAX_SIZE // 2 ** 20} МБ"
+        )
+    parser = ImageFile.Parser()
+    try:
+        for chunk in chunks(payload, HEADER_SIZE):
+            parser.feed(chunk)
+            if parser.image is not None:
+                break
+    except (OSError, SyntaxError):
+        raise InvalidImage("Файл не является изображением")
+    if parser.image is None:
+        raise InvalidImage("Файл не является изображением")
+    width, height = parser.image.size
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise ImageTooLarge(
+            "Изображение больше "
+            f"{settings.IMAGE_UPLOAD_MAX_PIXELS // 10 ** 6} мегапикселей"
+        )
+
+
+def decode_to_file(payload):
+    """Декодирует base64 кусками во временный файл и возвращает его путь."""
+    with NamedTemporaryFile(prefix="recipe-image-", delete=False) as file:
+        try:
+            for chunk in chunks(payload):
+                file.write(chunk)
+        except InvalidImage:
+            os.remove(file.name)
+            raise
+    return file.name
+
+
+def encode(image, size, image_format, **options):
+    image = image.copy()
+    image.thumbnail(size)
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def save_variants(source):
+    """Нормализует изображение и сохраняет его варианты в хранилище.
+
+    Возвращает имена файлов по полям рецепта. Метаданные отбрасываются: в
+    файлы пишутся только пиксели.
+    """
+    with Image.open(source) as original:
+        original.load()
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    name = uuid4().hex
+    variants = (
+        ("image", "jpg", settings.RECIPE_IMAGE_SIZE, "JPEG", 85),
+        ("image_webp", "webp", settings.RECIPE_IMAGE_SIZE, "WEBP", 80),
+        ("thumbnail", "webp", settings.RECIPE_THUMBNAIL_SIZE, "WEBP", 80),
+    )
+    saved = {}
+    try:
+        for field_name, extension, size, image_format, quality in variants:
+            field = Recipe._meta.get_field(field_name)
+            saved[field_name] = field.storage.save(
+                field.generate_filename(None, f"{name}.{extension}"),
+                encode(image, size, image_format, quality=quality),
+            )
+    except Exception:
+        delete_files(saved.values())
+        raise
+    return saved
+
+
+def delete_files(names):
+    for name in names:
+        if name and name != settings.RECIPE_IMAGE_PLACEHOLDER:
+            default_storage.delete(name)
+
+
+def process_recipe_image(recipe_id, file, source=""):
+    """Заменяет изображение рецепта вариантами, построенными из file.
+
+    source — ожидающая загрузка, из которой прочитан file. Если за время
+    обработки ее сменили, результат отбрасывается. Прежние файлы рецепта и
+    сама загрузка удаляются после коммита замены.
+    """
+    saved = save_variants(file)
+    stale = list(saved.values())
+    with transaction.atomic():
+        recipe = (
+            Recipe.objects.select_for_update()
+            .filter(pk=recipe_id, image_source=source)
+            .first()
+        )
+        if recipe is not None:
+            stale = [getattr(recipe, field).name for field in VARIANTS]
+            stale.append(source)
+            for field, name in saved.items():
+                setattr(recipe, field, name)
+            recipe.image_source = ""
+            recipe.save(update_fields=(*VARIANTS, "image_source"))
+        transaction.on_commit(lambda: delete_files(stale))
+    return recipe is not None
+
+
+def process_pending(recipe_id):
+    """Обрабатывает ожидающую загрузку рецепта.
+
+    Загрузка хранится в MEDIA_ROOT и удаляется только после успешной
+    замены, поэтому потерянную при перезапуске воркера задачу повторит
+    команда make_image_variants.
+    """
+    source = (
+        Recipe.objects.filter(pk=recipe_id)
+        .values_list("image_source", flat=True)
+        .first()
+    )
+    if not source:
+        return False
+    try:
+        with default_storage.open(source, "rb") as file:
+            return process_recipe_image(recipe_id, file, source)
+    except UnidentifiedImageError:
+        logger.warning("Загрузка %s не является изображением", source)
+        if Recipe.objects.filter(pk=recipe_id, image_source=source).update(
+            image_source=""
+        ):
+            delete_files((source,))
+    except Exception:
+        logger.exception("Не удалось обработать изображение %s", recipe_id)
+    return False
+
+
+def process_in_worker(recipe_id):
+    try:
+        process_pending(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def submit(recipe_id):
+    if executor is None:
+        process_pending(recipe_id)
+    else:
+        executor.submit(process_in_worker, recipe_id)
+
+
+def store_upload(payload):
+    """Декодирует base64 во временный файл и переносит его в хранилище."""
+    path = decode_to_file(payload)
+    try:
+        with open(path, "rb") as file:
+            return default_storage.save(
+                f"{UPLOAD_DIR}/{uuid4().hex}", File(file)
+            )
+    finally:
+        os.remove(path)
+
+
+@contextmanager
+def stored_upload(payload):
+    """Сохраняет загрузку в хранилище на время блока.
+
+    Если блок завершился исключением, файл удаляется. Транзакцию нужно
+    открывать внутри блока, чтобы сюда дошла и ошибка коммита; загрузки,
+    откаченные внешней транзакцией, удаляет purge_uploads.
+    """
+    if payload is None:
+        yield None
+        return
+    name = store_upload(payload)
+    try:
+        yield name
+    except BaseException:
+        delete_files((name,))
+        raise
+
+
+def schedule_image_processing(recipe, source):
+    """Записывает загрузку в рецепт и ставит ее в пул обработки.
+
+    Обработка начинается после коммита транзакции. Необработанная прежняя
+    загрузка удаляется: результат ее обработки уже не понадобится.
+    """
+    previous = recipe.image_source.name
+    recipe.image_source = source
+    Recipe.objects.filter(pk=recipe.pk).update(image_source=source)
+    transaction.on_commit(lambda: delete_files((previous,)))
+    transaction.on_commit(lambda: submit(recipe.pk))
+
+
+def purge_uploads(age):
+    """Удаляет загрузки старше age, на которые не ссылается ни один рецепт.
+
+    Такие файлы остаются после откаченных транзакций и удаленных рецептов.
+    """
+    try:
+        files = default_storage.listdir(UPLOAD_DIR)[1]
+    except FileNotFoundError:
+        return 0
+    names = {f"{UPLOAD_DIR}/{file}" for file in files}
+    names -= set(
+        Recipe.objects.filter(image_source__in=names).values_list(
+            "image_source", flat=True
+        )
+    )
+    threshold = timezone.now() - age
+    stale = [
+        name
+        for name in names
+        if default_storage.get_modified_time(name) < threshold
+    ]
+    delete_files(stale)
+    return len(stale)
@@ -1,9 +1,13 @@
 import csv
+from contextlib import contextmanager
+from itertools import islice
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
 
-from recipes.models import IngredientAmount, Recipe, User
+from recipes.models import IngredientAmount, Recipe, User, recount_counters
 
 Models = {
     User: "users_user.csv",
@@ -12,18 +16,99 @@ Models = {
     IngredientAmount: "ingredientamount.csv",
 }
 
+DEFERRED_INDEXES = {
+    Recipe: ("recipe_search_idx",),
+}
+
+
+def add_indexes(indexes):
+    if connection.vendor == "postgresql":
+        # Внешние ключи Django создает DEFERRABLE INITIALLY DEFERRED, а
+        # PostgreSQL не строит индекс на таблице с ожидающими событиями
+        # триггеров: отложенные проверки нужно выполнить до CREATE INDEX.
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.add_index(model, index)
+
+
+@contextmanager
+def deferred_indexes(models):
+    """Удаляет индексы на время загрузки и строит их заново в конце.
+
+    Откладываются только индексы, не обеспечивающие ограничения. Если
+    загрузка упала внутри транзакции, индексы вернет ее откат, иначе они
+    строятся заново.
+    """
+    indexes = [
+        (model, index)
+        for model in models
+        for index in model._meta.indexes
+        if index.name in DEFERRED_INDEXES.get(model, ())
+    ]
+    with connection.schema_editor() as editor:
+        for model, index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    except BaseException:
+        if not connection.in_atomic_block:
+            add_indexes(indexes)
+        raise
+    add_indexes(indexes)
+
+
+def bulk_insert(model, objects, batch_size):
+    """Вставляет объекты пачками по batch_size; возвращает их число."""
+    count = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return count
+        model.objects.bulk_create(batch)
+        count += len(batch)
+
+
+def reset_sequences(models):
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
 
 class Command(BaseCommand):
     help = "Загрузка данных из csv файлов"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество строк в одном INSERT",
+        )
+
     def handle(self, *args, **options):
-        for model, csv_files in Models.items():
-            with open(
-                f"{settings.BASE_DIR}/data/{csv_files}", "r", encoding="utf-8"
-            ) as csv_file:
-                reader = csv.DictReader(csv_file)
-                model.objects.bulk_create(model(**data) for data in reader)
-            self.stdout.write(
-                f"Данные для таблицы {model.__name__} успешно загружены"
-            )
+        with transaction.atomic():
+            with deferred_indexes(Models):
+                for model, csv_files in Models.items():
+                    with open(
+                        f"{settings.BASE_DIR}/data/{csv_files}",
+                        "r",
+                        encoding="utf-8",
+                    ) as csv_file:
+                        count = bulk_insert(
+                            model,
+                            (
+                                model(**data)
+                                for data in csv.DictReader(csv_file)
+                            ),
+                            options["batch_size"],
+                        )
+                    self.stdout.write(
+                        f"Данные для таблицы {model.__name__} успешно "
+                        f"загружены: {count}"
+                    )
+                Recipe.objects.update_search_vector()
+            recount_counters()
+            reset_sequences(list(Models))
         return "База данных успешно загружена."
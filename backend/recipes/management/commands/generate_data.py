@@ -0,0 +1,282 @@
+import random
+from itertools import accumulate, count
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import (FavoriteRecipe, FeedItem, Ingredient,
+                            IngredientAmount, Recipe, ShoppingCart,
+                            ShoppingListIngredient, Subscribe, Tag, User,
+                            recount_counters)
+
+from .data_test import bulk_insert, deferred_indexes
+
+DISHES = (
+    "Суп",
+    "Салат",
+    "Пирог",
+    "Паста",
+    "Запеканка",
+    "Рагу",
+    "Омлет",
+    "Каша",
+    "Котлеты",
+    "Блины",
+)
+WORDS = (
+    "курица",
+    "сыр",
+    "томаты",
+    "грибы",
+    "картофель",
+    "рис",
+    "сливки",
+    "зелень",
+    "чеснок",
+    "лук",
+    "перец",
+    "морковь",
+)
+PASSWORD = "bench-password"
+
+
+def popular(items, rng):
+    """Выбор с длинным хвостом: первые элементы встречаются чаще."""
+    weights = list(accumulate(1 / rank for rank in range(1, len(items) + 1)))
+    return lambda k=1: rng.choices(items, cum_weights=weights, k=k)
+
+
+class Command(BaseCommand):
+    help = "Синтетические данные для нагрузочных тестов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=5000)
+        parser.add_argument("--tags", type=int, default=6)
+        parser.add_argument(
+            "--ingredients",
+            type=int,
+            nargs=2,
+            default=(5, 30),
+            metavar=("MIN", "MAX"),
+            help="Число ингредиентов в рецепте",
+        )
+        parser.add_argument(
+            "--favorites", type=int, default=20, help="Избранных на человека"
+        )
+        parser.add_argument(
+            "--cart", type=int, default=5, help="Рецептов в корзине"
+        )
+        parser.add_argument(
+            "--subscriptions", type=int, default=10, help="Подписок"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix", default="bench", help="Префикс имен пользователей"
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество строк в одном INSERT",
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        prefix = f"{options['prefix']}{options['seed']}_"
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f"Пользователи {prefix}* уже есть, задайте другой --seed"
+            )
+        with transaction.atomic():
+            with deferred_indexes([Recipe]):
+                tags = self.ensure_tags(options["tags"])
+                ingredients = self.ensure_ingredients(
+                    options["ingredients"][1]
+                )
+                users = self.create_users(prefix, options["users"])
+                recipes = self.create_recipes(
+                    users,
+                    tags,
+                    ingredients,
+                    options["recipes"],
+                    options["ingredients"],
+                )
+                self.link(
+                    FavoriteRecipe,
+                    "favorite_recipe",
+                    users,
+                    recipes,
+                    options["favorites"],
+                )
+                self.link(
+                    ShoppingCart,
+                    "recipe",
+                    users,
+                    recipes,
+                    options["cart"],
+                )
+                self.link(
+                    Subscribe,
+                    "author",
+                    users,
+                    users,
+                    options["subscriptions"],
+                )
+                Recipe.objects.filter(
+                    search_vector__isnull=True
+                ).update_search_vector()
+            self.fill_derived(users)
+        return (
+            f"Сгенерировано: пользователей {len(users)}, "
+            f"рецептов {len(recipes)}; пароль {PASSWORD}"
+        )
+
+    def report(self, name, number):
+        self.stdout.write(f"{name}: {number}")
+
+    def ensure_tags(self, number):
+        existing = list(Tag.objects.values_list("id", flat=True))
+        missing = number - len(existing)
+        if missing > 0:
+            start = Tag.objects.count()
+            Tag.objects.bulk_create(
+                Tag(
+                    name=f"Тег {start + n}",
+                    slug=f"tag-{start + n}",
+                    color=None,
+                )
+                for n in range(missing)
+            )
+            existing = list(Tag.objects.values_list("id", flat=True))
+        return existing
+
+    def ensure_ingredients(self, number):
+        existing = list(Ingredient.objects.values_list("id", flat=True))
+        missing = number - len(existing)
+        if missing > 0:
+            start = len(existing)
+            Ingredient.objects.bulk_create(
+                Ingredient(
+                    name=f"Ингредиент {start + n}", measurement_unit="г"
+                )
+                for n in range(missing)
+            )
+            existing = list(Ingredient.objects.values_list("id", flat=True))
+        return existing
+
+    def create_users(self, prefix, number):
+        password = make_password(PASSWORD)
+        bulk_insert(
+            User,
+            (
+                User(
+                    username=f"{prefix}{n}",
+                    email=f"{prefix}{n}@example.com",
+                    first_name="Имя",
+                    last_name=f"Фамилия {n}",
+                    password=password,
+                )
+                for n in range(number)
+            ),
+            self.batch_size,
+        )
+        users = list(
+            User.objects.filter(username__startswith=prefix)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        self.report("Пользователи", len(users))
+        return users
+
+    def create_recipes(self, users, tags, ingredients, number, sizes):
+        rng = self.rng
+        author = popular(users, rng)
+        numbers = count()
+        recipes = []
+        while len(recipes) < number:
+            batch = Recipe.objects.bulk_create(
+                Recipe(
+                    author_id=author()[0],
+                    name=f"{rng.choice(DISHES)} {next(numbers)}",
+                    text=" ".join(rng.choices(WORDS, k=rng.randint(5, 40))),
+                    cooking_time=rng.randint(1, 180),
+                    image=settings.RECIPE_IMAGE_PLACEHOLDER,
+                )
+                for _ in range(min(self.batch_size, number - len(recipes)))
+            )
+            bulk_insert(
+                IngredientAmount,
+                (
+                    IngredientAmount(
+                        recipe_id=recipe.pk,
+                        ingredient_id=ingredient_id,
+                        amount=rng.randint(1, 500),
+                    )
+                    for recipe in batch
+                    for ingredient_id in rng.sample(
+                        ingredients, rng.randint(*sizes)
+                    )
+                ),
+                self.batch_size,
+            )
+            bulk_insert(
+                Recipe.tags.through,
+                (
+                    Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_id)
+                    for recipe in batch
+                    for tag_id in rng.sample(
+                        tags, rng.randint(1, min(3, len(tags)))
+                    )
+                ),
+                self.batch_size,
+            )
+            recipes.extend(recipe.pk for recipe in batch)
+        self.report("Рецепты", len(recipes))
+        return recipes
+
+    def link(self, model, field, users, targets, per_user):
+        """Связи пользователей с популярными рецептами или авторами."""
+        choose = popular(targets, self.rng)
+        pairs = (
+            (user_id, target_id)
+            for user_id in users
+            for target_id in set(choose(per_user)) - {user_id}
+        )
+        number = bulk_insert(
+            model,
+            (
+                model(user_id=user_id, **{f"{field}_id": target_id})
+                for user_id, target_id in pairs
+            ),
+            self.batch_size,
+        )
+        self.report(model._meta.verbose_name_plural, number)
+
+    def fill_derived(self, users):
+        """Списки покупок, ленты и счетчики, которые ведут сигналы."""
+        bulk_insert(
+            ShoppingListIngredient,
+            (
+                ShoppingListIngredient(
+                    user_id=row["user_id"],
+                    ingredient_id=row["recipe__recipe__ingredient_id"],
+                    amount=row["amount"],
+                )
+                for row in ShoppingListIngredient.objects.expected()
+                .filter(user_id__in=users)
+                .iterator()
+            ),
+            self.batch_size,
+        )
+        feed = FeedItem.objects.insert_select(
+            "SELECT s.user_id, r.id, r.pub_date FROM {recipes} r "
+            "JOIN {subscribes} s ON s.author_id = r.author_id "
+            "WHERE s.user_id = ANY(%s)",
+            [users],
+        )
+        self.report("Ленты подписок", feed)
+        recount_counters()
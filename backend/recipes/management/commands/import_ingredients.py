@@ -1,27 +1,181 @@
 import csv
+import json
+import re
+from itertools import islice
+from pathlib import Path
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db import IntegrityError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from api.cache import bump_versions
+from foodgram.streams import Echo
 from recipes.models import Ingredient
 
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = re.compile(r"[\s,]*")
+
+
+class CopyStream:
+    """Файлоподобный объект для COPY, читающий строки из генератора."""
+
+    def __init__(self, rows, progress):
+        writer = csv.writer(Echo())
+        self.lines = (writer.writerow(row) for row in rows)
+        self.progress = progress
+        self.buffer = ""
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line
+            self.count += 1
+            self.progress(self.count)
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+def csv_rows(file):
+    reader = csv.reader(file)
+    for row in reader:
+        if row == ["name", "measurement_unit"]:
+            continue
+        yield row
+
+
+def json_rows(file):
+    """Объекты верхнего массива JSON по одному, без загрузки файла.
+
+    Элементы, которые не являются объектами, пропускаются как некорректные.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидался JSON-массив ингредиентов")
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith("]", position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                raise CommandError("Некорректный JSON")
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if isinstance(item, dict):
+            yield item.get("name"), item.get("measurement_unit")
+        else:
+            # Не объект: clean_rows учтет его как некорректную строку.
+            yield (item,)
+
+
+def clean_rows(rows, invalid):
+    for row in rows:
+        name, measurement_unit = (
+            (str(value or "").strip() for value in row[:2])
+            if len(row) >= 2
+            else ("", "")
+        )
+        if not name or not measurement_unit:
+            invalid.append(row)
+            continue
+        yield name, measurement_unit
+
 
 class Command(BaseCommand):
-    help = "Загрузка данных из csv файлов"
+    help = "Загрузка ингредиентов из csv или json файла"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=f"{settings.BASE_DIR}/data/ingredients.csv",
+            help="Путь к ingredients.csv или ingredients.json",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Размер пачки, если БД не PostgreSQL",
+        )
+
+    def progress(self, count):
+        if count % 10000 == 0:
+            self.stdout.write(f"Прочитано строк: {count}")
 
     def handle(self, *args, **options):
-        with open(
-            f"{settings.BASE_DIR}/data/ingredients.csv",
-            # f'{settings.STATIC_ROOT}/data/ingredients.csv',
-            "r",
-            encoding="utf-8",
-        ) as csv_file:
-            reader = csv.DictReader(csv_file)
-            try:
-                Ingredient.objects.bulk_create(
-                    Ingredient(**items) for items in reader
-                )
-            except IntegrityError:
-                return "Такие ингредиенты уже есть..."
-        return f"{Ingredient.objects.count()} - ингредиентов успешно загружено"
+        path = Path(options["path"])
+        if path.suffix not in (".csv", ".json"):
+            raise CommandError("Поддерживаются только файлы .csv и .json")
+        invalid = []
+        with open(path, "r", encoding="utf-8") as file:
+            rows = clean_rows(
+                json_rows(file) if path.suffix == ".json" else csv_rows(file),
+                invalid,
+            )
+            with transaction.atomic():
+                if connection.vendor == "postgresql":
+                    read, inserted = self.copy(rows)
+                else:
+                    read, inserted = self.bulk_create(
+                        rows, options["batch_size"]
+                    )
+        bump_versions("ingredients")
+        return (
+            f"Прочитано: {read + len(invalid)}, добавлено: {inserted}, "
+            f"уже были в базе или повторялись: {read - inserted}, "
+            f"пропущено некорректных: {len(invalid)}"
+        )
+
+    def copy(self, rows):
+        """COPY во временную таблицу и слияние по unique_name_measurement.
+
+        Уникальный ключ покрывает все поля ингредиента, поэтому совпавшие
+        строки не обновляются, а пропускаются.
+        """
+        stream = CopyStream(rows, self.progress)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE ingredient_import "
+                "(name text, measurement_unit text) ON COMMIT DROP"
+            )
+            cursor.cursor.copy_expert(
+                "COPY ingredient_import (name, measurement_unit) "
+                "FROM STDIN WITH (FORMAT csv)",
+                stream,
+            )
+            cursor.execute(
+                f"INSERT INTO {Ingredient._meta.db_table} "
+                "(name, measurement_unit) "
+                "SELECT DISTINCT name, measurement_unit "
+                "FROM ingredient_import "
+                "ON CONFLICT ON CONSTRAINT unique_name_measurement "
+                "DO NOTHING"
+            )
+            return stream.count, cursor.rowcount
+
+    def bulk_create(self, rows, batch_size):
+        read = 0
+        before = Ingredient.objects.count()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            read += len(batch)
+            self.progress(read)
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ),
+                ignore_conflicts=True,
+            )
+        return read, Ingredient.objects.count() - before
@@ -2,8 +2,8 @@ import csv
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db import IntegrityError
 
+from api.cache import bump_versions
 from recipes.models import Tag
 
 
@@ -18,11 +18,12 @@ class Command(BaseCommand):
             encoding="utf-8",
         ) as csv_file:
             reader = csv.DictReader(csv_file)
-            try:
-                Tag.objects.bulk_create(Tag(**items) for items in reader)
-            except IntegrityError:
-                return "Такие Теги уже есть..."
+            before = Tag.objects.count()
+            Tag.objects.bulk_create(
+                (Tag(**items) for items in reader), ignore_conflicts=True
+            )
+        bump_versions("tags")
         return (
-            f"Теги успешно загружены -> "
+            f"Добавлено тегов: {Tag.objects.count() - before} -> "
             f'{(", ").join([_.get("name") for _ in Tag.objects.values()])}'
         )
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_pending, process_recipe_image, purge_uploads
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Обработка незавершенных загрузок и создание WebP и миниатюр для "
+        "уже загруженных изображений"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--purge-after",
+            type=int,
+            default=24,
+            help="Через сколько часов удалять загрузки без рецепта",
+        )
+
+    def handle(self, *args, **options):
+        pending = Recipe.objects.exclude(image_source="").values_list(
+            "pk", flat=True
+        )
+        retried = sum(process_pending(pk) for pk in pending.iterator())
+        recipes = (
+            Recipe.objects.filter(thumbnail="", image_source="")
+            .exclude(image="")
+            .exclude(image=settings.RECIPE_IMAGE_PLACEHOLDER)
+        )
+        processed = 0
+        for recipe in recipes.iterator():
+            try:
+                with recipe.image.open("rb") as image:
+                    processed += process_recipe_image(recipe.pk, image)
+            except OSError:
+                self.stderr.write(f"Нет файла изображения: {recipe.image}")
+        purged = purge_uploads(timedelta(hours=options["purge_after"]))
+        return (
+            f"Обработано загрузок: {retried}, изображений: {processed}; "
+            f"удалено брошенных загрузок: {purged}"
+        )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingListIngredient
+
+
+class Command(BaseCommand):
+    help = "Пересчет итогов списков покупок по корзинам пользователей"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Только сверить сохраненные итоги, ничего не меняя",
+        )
+
+    def handle(self, *args, **options):
+        expected = {
+            (row["user_id"], row["recipe__recipe__ingredient_id"]): (
+                row["amount"]
+            )
+            for row in ShoppingListIngredient.objects.expected().iterator()
+        }
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in (
+                ShoppingListIngredient.objects.values_list(
+                    "user_id", "ingredient_id", "amount"
+                ).iterator()
+            )
+        }
+        mismatched = [
+            key
+            for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        if options["verify"]:
+            if mismatched:
+                raise CommandError(
+                    f"Найдено расхождений в списках покупок: {len(mismatched)}"
+                )
+            return "Списки покупок совпадают с корзинами"
+        with transaction.atomic():
+            ShoppingListIngredient.objects.all().delete()
+            ShoppingListIngredient.objects.bulk_create(
+                (
+                    ShoppingListIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    )
+                    for (user_id, ingredient_id), amount in expected.items()
+                ),
+                batch_size=1000,
+            )
+        return (
+            f"Списки покупок пересчитаны: {len(expected)} строк, "
+            f"исправлено расхождений: {len(mismatched)}"
+        )
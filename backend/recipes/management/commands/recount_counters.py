@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import recount_counters
+
+
+class Command(BaseCommand):
+    help = "Пересчет счетчиков избранного, рецептов и подписчиков"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Только сверить счетчики, ничего не меняя",
+        )
+
+    def handle(self, *args, **options):
+        drift = recount_counters(fix=not options["verify"])
+        report = ", ".join(f"{name}: {count}" for name, count in drift.items())
+        if options["verify"]:
+            if any(drift.values()):
+                raise CommandError(
+                    f"Найдены расхождения в счетчиках: {report}"
+                )
+            return "Счетчики совпадают с данными"
+        return f"Счетчики пересчитаны, исправлено расхождений: {report}"
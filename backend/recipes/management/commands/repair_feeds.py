@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import FeedItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Добавление в ленты подписчиков рецептов, рассылка которых не "
+        "завершилась, например из-за перезапуска воркера"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            help="Проверять рецепты за последние часы, по умолчанию все",
+        )
+
+    def handle(self, *args, **options):
+        since = (
+            timezone.now() - timedelta(hours=options["hours"])
+            if options["hours"]
+            else None
+        )
+        added = FeedItem.objects.repair(since)
+        return f"Добавлено записей в ленты: {added}"
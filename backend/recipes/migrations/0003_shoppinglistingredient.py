@@ -0,0 +1,90 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model("recipes", "ShoppingCart")
+    ShoppingListIngredient = apps.get_model(
+        "recipes", "ShoppingListIngredient"
+    )
+    totals = (
+        ShoppingCart.objects.filter(recipe__recipe__ingredient__isnull=False)
+        .values("user_id", "recipe__recipe__ingredient_id")
+        .annotate(amount=Sum("recipe__recipe__amount"))
+        .order_by()
+    )
+    ShoppingListIngredient.objects.bulk_create(
+        (
+            ShoppingListIngredient(
+                user_id=row["user_id"],
+                ingredient_id=row["recipe__recipe__ingredient_id"],
+                amount=row["amount"],
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0002_recipe_pub_date_id_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingListIngredient",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.PositiveIntegerField(verbose_name="Количество"),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_lists",
+                        to="recipes.ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_list",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ингредиент в списке покупок",
+                "verbose_name_plural": "Ингредиенты в списке покупок",
+                "ordering": ("id",),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="shoppinglistingredient",
+            constraint=models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique ingredient in shopping list",
+            ),
+        ),
+        migrations.RunPython(fill_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:46
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Recipe.objects.update(
+        search_vector=(
+            SearchVector("name", weight="A", config="russian")
+            + SearchVector("text", weight="B", config="russian")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_shoppinglistingredient"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="recipe_search_idx"
+            ),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.3 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_webp",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                upload_to="recipes/webp",
+                verbose_name="Изображение рецепта в WebP",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="thumbnail",
+            field=models.ImageField(
+                blank=True,
+                editable=False,
+                upload_to="recipes/thumbnails",
+                verbose_name="Миниатюра рецепта",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:04
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    FavoriteRecipe = apps.get_model("recipes", "FavoriteRecipe")
+    Subscribe = apps.get_model("recipes", "Subscribe")
+    User = apps.get_model("users", "User")
+    Recipe.objects.update(
+        favorites_count=count_subquery(FavoriteRecipe, "favorite_recipe")
+    )
+    User.objects.update(
+        recipes_count=count_subquery(Recipe, "author"),
+        followers_count=count_subquery(Subscribe, "author"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_image_variants"),
+        ("users", "0002_user_followers_count_user_recipes_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    FeedItem = apps.get_model("recipes", "FeedItem")
+    Recipe = apps.get_model("recipes", "Recipe")
+    Subscribe = apps.get_model("recipes", "Subscribe")
+    schema_editor.execute(
+        f"INSERT INTO {FeedItem._meta.db_table} "
+        "(user_id, recipe_id, pub_date) "
+        f"SELECT s.user_id, r.id, r.pub_date FROM {Recipe._meta.db_table} r "
+        f"JOIN {Subscribe._meta.db_table} s ON s.author_id = r.author_id"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0006_recipe_favorites_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "pub_date",
+                    models.DateTimeField(
+                        verbose_name="Дата публикации рецепта"
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_items",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Подписчик",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Рецепт в ленте",
+                "verbose_name_plural": "Ленты подписок",
+                "ordering": ("-pub_date", "-recipe_id"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="feeditem",
+            index=models.Index(
+                fields=["user", "-pub_date", "-recipe"],
+                name="feed_user_pub_date_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="feeditem",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique recipe in feed"
+            ),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
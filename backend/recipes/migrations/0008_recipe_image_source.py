@@ -0,0 +1,23 @@
+# Generated by Django 4.1.3 on 2026-10-18 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_feeditem"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_source",
+            field=models.FileField(
+                blank=True,
+                editable=False,
+                upload_to="recipes/uploads",
+                verbose_name="Загрузка, ожидающая обработки",
+            ),
+        ),
+    ]
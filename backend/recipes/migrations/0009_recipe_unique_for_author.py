@@ -0,0 +1,58 @@
+# Generated by Django 4.1.3 on 2026-10-18 18:05
+
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def rename_duplicates(apps, schema_editor):
+    """Добавляет id к повторяющимся у автора названиям рецептов.
+
+    Самый ранний рецепт сохраняет название, остальные получают суффикс
+    « (id)», поэтому ограничение unique_for_author создается без удаления
+    данных.
+    """
+    Recipe = apps.get_model("recipes", "Recipe")
+    max_length = Recipe._meta.get_field("name").max_length
+    duplicates = (
+        Recipe.objects.values("author_id", "name")
+        .annotate(first_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    renamed = []
+    for group in duplicates:
+        recipes = Recipe.objects.filter(
+            author_id=group["author_id"], name=group["name"]
+        ).exclude(id=group["first_id"])
+        for recipe in recipes:
+            suffix = f" ({recipe.id})"
+            recipe.name = recipe.name[: max_length - len(suffix)] + suffix
+            recipe.save(update_fields=("name",))
+            renamed.append(recipe.id)
+    Recipe.objects.filter(id__in=renamed).update(
+        search_vector=(
+            SearchVector("name", weight="A", config="russian")
+            + SearchVector("text", weight="B", config="russian")
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    # Переименование выполняется в своей транзакции: в одной транзакции с
+    # обновлением строк PostgreSQL не дает изменить таблицу.
+    atomic = False
+
+    dependencies = [
+        ("recipes", "0008_recipe_image_source"),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="recipe",
+            constraint=models.UniqueConstraint(
+                fields=("name", "author"), name="unique_for_author"
+            ),
+        ),
+    ]
@@ -1,8 +1,17 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, SearchVectorField)
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import (Count, Exists, F, OuterRef, Prefetch, Subquery,
+                              Sum, Value)
+from django.db.models.functions import Coalesce
+
+from users.models import CountersMixin
 
 MAX_LEN_RECIPES = 255
+SEARCH_CONFIG = "russian"
 
 User = get_user_model()
 
@@ -79,7 +88,92 @@ class Ingredient(models.Model):
         return f"{self.name} ({self.measurement_unit})"
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def update_search_vector(self):
+        return self.update(
+            search_vector=(
+                SearchVector("name", weight="A", config=SEARCH_CONFIG)
+                + SearchVector("text", weight="B", config=SEARCH_CONFIG)
+            )
+        )
+
+    def search(self, text):
+        """Полнотекстовый поиск по названию и описанию с ранжированием."""
+        query = SearchQuery(
+            text, config=SEARCH_CONFIG, search_type="websearch"
+        )
+        return (
+            self.filter(search_vector=query)
+            .annotate(rank=SearchRank(models.F("search_vector"), query))
+            .order_by("-rank", "-pub_date", "-id")
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                FavoriteRecipe.objects.filter(
+                    user=user, favorite_recipe=OuterRef("pk")
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
+    def for_read(self, user):
+        """Рецепты со всеми связями, нужными для RecipeReadSerializer."""
+        if user.is_authenticated:
+            is_subscribed = Exists(
+                Subscribe.objects.filter(user=user, author=OuterRef("pk"))
+            )
+        else:
+            is_subscribed = Value(False)
+        return self.with_user_flags(user).prefetch_related(
+            Prefetch(
+                "author",
+                queryset=User.objects.annotate(is_subscribed=is_subscribed),
+            ),
+            "tags",
+            Prefetch(
+                "recipe",
+                queryset=IngredientAmount.objects.select_related(
+                    "ingredient"
+                ),
+            ),
+        )
+
+    def latest_by_authors(self, author_ids, limit=None):
+        """Последние limit рецептов каждого автора одним запросом."""
+        if not author_ids:
+            return {}
+        table = self.model._meta.db_table
+        placeholders = ", ".join(["%s"] * len(author_ids))
+        recipes = self.raw(
+            f"""
+            SELECT * FROM (
+                SELECT {table}.*, ROW_NUMBER() OVER (
+                    PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+                ) AS row_number
+                FROM {table}
+                WHERE author_id IN ({placeholders})
+            ) AS ranked
+            WHERE %s IS NULL OR row_number <= %s
+            ORDER BY author_id, row_number
+            """,
+            [*author_ids, limit, limit],
+        )
+        latest = {author_id: [] for author_id in author_ids}
+        for recipe in recipes:
+            latest[recipe.author_id].append(recipe)
+        return latest
+
+
+class Recipe(CountersMixin, models.Model):
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -100,6 +194,24 @@ class Recipe(models.Model):
         "Изображение рецепта",
         upload_to="recipes/images",
     )
+    image_webp = models.ImageField(
+        "Изображение рецепта в WebP",
+        upload_to="recipes/webp",
+        blank=True,
+        editable=False,
+    )
+    thumbnail = models.ImageField(
+        "Миниатюра рецепта",
+        upload_to="recipes/thumbnails",
+        blank=True,
+        editable=False,
+    )
+    image_source = models.FileField(
+        "Загрузка, ожидающая обработки",
+        upload_to="recipes/uploads",
+        blank=True,
+        editable=False,
+    )
     name = models.CharField(
         "Название рецепта",
         max_length=MAX_LEN_RECIPES,
@@ -115,11 +227,25 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField(
         "Дата публикации рецепта", auto_now_add=True
     )
+    search_vector = SearchVectorField(null=True, editable=False)
+    favorites_count = models.PositiveIntegerField(
+        "В избранном", default=0, editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    COUNTER_FIELDS = ("favorites_count",)
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ("-pub_date",)
+        indexes = (
+            models.Index(
+                fields=("-pub_date", "-id"), name="recipe_pub_date_id_idx"
+            ),
+            GinIndex(fields=("search_vector",), name="recipe_search_idx"),
+        )
         constraints = (
             models.UniqueConstraint(
                 fields=("name", "author"), name="unique_for_author"
@@ -129,6 +255,30 @@ class Recipe(models.Model):
     def __str__(self):
         return f"Автор: {self.author.username} рецепт: {self.name}"
 
+    SEARCH_FIELDS = ("name", "text")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.search_source = instance.get_search_source()
+        return instance
+
+    def get_search_source(self):
+        return tuple(self.__dict__.get(field) for field in self.SEARCH_FIELDS)
+
+    def search_source_changed(self, update_fields):
+        if update_fields is not None:
+            return not set(self.SEARCH_FIELDS).isdisjoint(update_fields)
+        return getattr(self, "search_source", None) != self.get_search_source()
+
+    def save(self, *args, **kwargs):
+        """Вектор поиска пересчитывается, только если менялись name/text."""
+        changed = self.search_source_changed(kwargs.get("update_fields"))
+        super().save(*args, **kwargs)
+        if changed:
+            Recipe.objects.filter(pk=self.pk).update_search_vector()
+            self.search_source = self.get_search_source()
+
 
 class IngredientAmount(models.Model):
     recipe = models.ForeignKey(
@@ -164,7 +314,48 @@ class IngredientAmount(models.Model):
         )
 
 
+class UserRecipeQuerySet(models.QuerySet):
+    """Пакетное добавление и удаление рецептов пользователя.
+
+    Поле рецепта задается атрибутом модели RECIPE_FIELD.
+    """
+
+    def change_many(self, sql, user_id, recipe_ids):
+        field = self.model._meta.get_field(self.model.RECIPE_FIELD)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql.format(
+                    table=self.model._meta.db_table,
+                    column=field.column,
+                    recipes=Recipe._meta.db_table,
+                ),
+                [user_id, list(recipe_ids)],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def add_many(self, user_id, recipe_ids):
+        """Возвращает id добавленных рецептов; существующие пропускаются."""
+        return self.change_many(
+            "INSERT INTO {table} (user_id, {column}) "
+            "SELECT %s, id FROM {recipes} WHERE id = ANY(%s) "
+            "ON CONFLICT DO NOTHING RETURNING {column}",
+            user_id,
+            recipe_ids,
+        )
+
+    def remove_many(self, user_id, recipe_ids):
+        """Возвращает id удаленных рецептов."""
+        return self.change_many(
+            "DELETE FROM {table} WHERE user_id = %s AND {column} = ANY(%s) "
+            "RETURNING {column}",
+            user_id,
+            recipe_ids,
+        )
+
+
 class FavoriteRecipe(models.Model):
+    RECIPE_FIELD = "favorite_recipe"
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -178,6 +369,8 @@ class FavoriteRecipe(models.Model):
         verbose_name="Избранный рецепт",
     )
 
+    objects = UserRecipeQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -227,6 +420,8 @@ class Subscribe(models.Model):
 
 
 class ShoppingCart(models.Model):
+    RECIPE_FIELD = "recipe"
+
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -240,6 +435,8 @@ class ShoppingCart(models.Model):
         verbose_name="Рецепт",
     )
 
+    objects = UserRecipeQuerySet.as_manager()
+
     class Meta:
         ordering = ("id",)
         constraints = [
@@ -256,3 +453,288 @@ class ShoppingCart(models.Model):
             f"Пользователь: {self.user.username},"
             f"рецепт в списке: {self.recipe.name}"
         )
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    def add_amounts(self, user_id, amounts):
+        """Прибавляет {id ингредиента: количество} к итогам пользователя."""
+        self.apply_amounts("SELECT %s", [user_id], amounts)
+
+    def apply_amounts(self, users, params, amounts):
+        """Прибавляет количества к итогам пользователей из запроса users.
+
+        Положительные количества добавляются через INSERT ... ON CONFLICT,
+        поэтому одновременное добавление нового ингредиента не падает на
+        уникальном ограничении; обнулившиеся строки удаляются. На каждый
+        вид изменения приходится один запрос на всех пользователей.
+        """
+        added = {key: value for key, value in amounts.items() if value > 0}
+        removed = {key: value for key, value in amounts.items() if value < 0}
+        if not added and not removed:
+            return
+        table = self.model._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            if added:
+                cursor.execute(
+                    f"INSERT INTO {table} (user_id, ingredient_id, amount) "
+                    "SELECT users.user_id, added.id, added.amount "
+                    f"FROM ({users}) AS users (user_id) "
+                    "CROSS JOIN unnest(%s, %s) AS added (id, amount) "
+                    "ON CONFLICT (user_id, ingredient_id) DO UPDATE "
+                    f"SET amount = {table}.amount + EXCLUDED.amount",
+                    [*params, list(added), list(added.values())],
+                )
+            if removed:
+                cursor.execute(
+                    f"UPDATE {table} SET amount = GREATEST("
+                    f"{table}.amount + removed.amount, 0) "
+                    "FROM unnest(%s, %s) AS removed (id, amount) "
+                    f"WHERE {table}.user_id IN ({users}) "
+                    f"AND {table}.ingredient_id = removed.id",
+                    [list(removed), list(removed.values()), *params],
+                )
+                cursor.execute(
+                    f"DELETE FROM {table} "
+                    f"WHERE user_id IN ({users}) AND ingredient_id = ANY(%s) "
+                    "AND amount = 0",
+                    [*params, list(removed)],
+                )
+
+    def add_recipe(self, user_id, recipe_id, sign=1):
+        self.add_amounts(
+            user_id,
+            {
+                ingredient_id: sign * amount
+                for ingredient_id, amount in recipe_amounts(recipe_id).items()
+            },
+        )
+
+    def add_recipes(self, user_id, recipe_ids, sign=1):
+        """Одним запросом суммирует ингредиенты нескольких рецептов."""
+        amounts = (
+            IngredientAmount.objects.filter(recipe_id__in=recipe_ids)
+            .values("ingredient_id")
+            .annotate(total=Sum("amount"))
+            .order_by()
+            .values_list("ingredient_id", "total")
+        )
+        self.add_amounts(
+            user_id,
+            {ingredient_id: sign * total for ingredient_id, total in amounts},
+        )
+
+    def remove_recipes(self, user_id, recipe_ids):
+        self.add_recipes(user_id, recipe_ids, sign=-1)
+
+    def remove_recipe(self, user_id, recipe_id):
+        self.add_recipe(user_id, recipe_id, sign=-1)
+
+    def change_recipe(self, recipe_id, old_amounts, new_amounts):
+        """Переносит изменение ингредиентов рецепта в корзины с ним."""
+        delta = {
+            ingredient_id: (
+                new_amounts.get(ingredient_id, 0)
+                - old_amounts.get(ingredient_id, 0)
+            )
+            for ingredient_id in old_amounts.keys() | new_amounts.keys()
+        }
+        self.apply_amounts(
+            f"SELECT user_id FROM {ShoppingCart._meta.db_table} "
+            "WHERE recipe_id = %s",
+            [recipe_id],
+            delta,
+        )
+
+    def expected(self):
+        """Итоги, посчитанные заново по корзинам покупок."""
+        return (
+            ShoppingCart.objects.filter(
+                recipe__recipe__ingredient__isnull=False
+            )
+            .values("user_id", "recipe__recipe__ingredient_id")
+            .annotate(amount=Sum("recipe__recipe__amount"))
+            .order_by()
+        )
+
+
+def recipe_amounts(recipe_id):
+    return dict(
+        IngredientAmount.objects.filter(recipe_id=recipe_id).values_list(
+            "ingredient_id", "amount"
+        )
+    )
+
+
+class ShoppingListIngredient(models.Model):
+    """Итоговое количество ингредиента в списке покупок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shopping_lists",
+        verbose_name="Ингредиент",
+    )
+    amount = models.PositiveIntegerField("Количество")
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        ordering = ("id",)
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="unique ingredient in shopping list",
+            )
+        ]
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списке покупок"
+
+    def __str__(self):
+        return (
+            f"Пользователь: {self.user.username}, "
+            f"{self.ingredient.name} — {self.amount}"
+        )
+
+
+class FeedQuerySet(models.QuerySet):
+    """Ленты подписчиков: рецепты авторов копируются при записи."""
+
+    def insert_select(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO {feed} (user_id, recipe_id, pub_date) "
+                "{select} ON CONFLICT DO NOTHING".format(
+                    feed=self.model._meta.db_table,
+                    select=sql.format(
+                        recipes=Recipe._meta.db_table,
+                        subscribes=Subscribe._meta.db_table,
+                    ),
+                ),
+                params,
+            )
+            return cursor.rowcount
+
+    def fan_out(self, recipe_id):
+        """Добавляет рецепт в ленты всех подписчиков автора."""
+        return self.insert_select(
+            "SELECT s.user_id, r.id, r.pub_date FROM {recipes} r "
+            "JOIN {subscribes} s ON s.author_id = r.author_id "
+            "WHERE r.id = %s",
+            [recipe_id],
+        )
+
+    def backfill(self, user_id, author_id):
+        """Добавляет в ленту пользователя все рецепты автора."""
+        return self.insert_select(
+            "SELECT %s, id, pub_date FROM {recipes} WHERE author_id = %s",
+            [user_id, author_id],
+        )
+
+    def repair(self, since=None):
+        """Добавляет в ленты рецепты, пропущенные при рассылке.
+
+        since — дата, начиная с которой проверяются рецепты; без нее
+        сверяются все ленты.
+        """
+        sql = (
+            "SELECT s.user_id, r.id, r.pub_date FROM {recipes} r "
+            "JOIN {subscribes} s ON s.author_id = r.author_id"
+        )
+        if since is None:
+            return self.insert_select(sql, [])
+        return self.insert_select(f"{sql} WHERE r.pub_date >= %s", [since])
+
+    def prune(self, user_id, author_id):
+        return self.filter(
+            user_id=user_id, recipe__author_id=author_id
+        ).delete()
+
+
+class FeedItem(models.Model):
+    """Рецепт автора в ленте подписчика."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_items",
+        verbose_name="Рецепт",
+    )
+    pub_date = models.DateTimeField("Дата публикации рецепта")
+
+    objects = FeedQuerySet.as_manager()
+
+    class Meta:
+        ordering = ("-pub_date", "-recipe_id")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique recipe in feed"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=("user", "-pub_date", "-recipe"),
+                name="feed_user_pub_date_idx",
+            ),
+        ]
+        verbose_name = "Рецепт в ленте"
+        verbose_name_plural = "Ленты подписок"
+
+    def __str__(self):
+        return (
+            f"Пользователь: {self.user.username}, "
+            f"рецепт в ленте: {self.recipe.name}"
+        )
+
+
+def count_subquery(model, field):
+    """Число строк model, ссылающихся на OuterRef("pk") через field."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+COUNTERS = (
+    (Recipe, "favorites_count", FavoriteRecipe, "favorite_recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "followers_count", Subscribe, "author"),
+)
+
+
+def change_counter(model, counter, pks, delta):
+    model.objects.filter(pk__in=pks).update(**{counter: F(counter) + delta})
+
+
+def recount_counters(fix=True):
+    """Сверяет счетчики с данными; возвращает {счетчик: расхождений}."""
+    drift = {}
+    with transaction.atomic():
+        for model, counter, source, field in COUNTERS:
+            expected = count_subquery(source, field)
+            drifted = model.objects.annotate(expected=expected).exclude(
+                **{counter: F("expected")}
+            )
+            drift[f"{model.__name__}.{counter}"] = drifted.count()
+            if fix:
+                model.objects.filter(pk__in=drifted.values("pk")).update(
+                    **{counter: expected}
+                )
+    return drift
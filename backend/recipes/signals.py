@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .feed import schedule_fan_out
+from .models import (COUNTERS, FeedItem, Recipe, ShoppingCart,
+                     ShoppingListIngredient, Subscribe, change_counter)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_added(sender, instance, created, **kwargs):
+    if created:
+        ShoppingListIngredient.objects.add_recipe(
+            instance.user_id, instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_removed(sender, instance, **kwargs):
+    ShoppingListIngredient.objects.remove_recipe(
+        instance.user_id, instance.recipe_id
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    if created:
+        schedule_fan_out(instance.pk)
+
+
+@receiver(post_save, sender=Subscribe)
+def subscribed(sender, instance, created, **kwargs):
+    if created:
+        FeedItem.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def unsubscribed(sender, instance, **kwargs):
+    FeedItem.objects.prune(instance.user_id, instance.author_id)
+
+
+def connect_counter(model, counter, source, field):
+    """Меняет model.counter на ±1 при создании и удалении строк source."""
+    attname = source._meta.get_field(field).attname
+
+    def created(sender, instance, created, **kwargs):
+        if created:
+            change_counter(model, counter, (getattr(instance, attname),), 1)
+
+    def deleted(sender, instance, **kwargs):
+        change_counter(model, counter, (getattr(instance, attname),), -1)
+
+    post_save.connect(
+        created, sender=source, weak=False, dispatch_uid=f"{counter}_created"
+    )
+    post_delete.connect(
+        deleted, sender=source, weak=False, dispatch_uid=f"{counter}_deleted"
+    )
+
+
+for counter in COUNTERS:
+    connect_counter(*counter)
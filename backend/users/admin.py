@@ -12,6 +12,8 @@ class MyUserAdmin(UserAdmin):
         "first_name",
         "last_name",
         "email",
+        "recipes_count",
+        "followers_count",
     )
     fields = (
         (
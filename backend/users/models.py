@@ -4,7 +4,29 @@ from django.db import models
 MAX_LEN_USER = 255
 
 
-class User(AbstractUser):
+class CountersMixin:
+    """Не перезаписывает счетчики при сохранении загруженного объекта.
+
+    Счетчики меняются только через F() в UPDATE, поэтому обычный save()
+    обновляет все поля, кроме перечисленных в COUNTER_FIELDS.
+    """
+
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CountersMixin, AbstractUser):
     """Пользователи"""
 
     username = models.CharField(
@@ -31,6 +53,14 @@ class User(AbstractUser):
         to='self',
         symmetrical=False,
     )
+    recipes_count = models.PositiveIntegerField(
+        "Число рецептов", default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        "Число подписчиков", default=0, editable=False
+    )
+
+    COUNTER_FIELDS = ("recipes_count", "followers_count")
 
     class Meta:
         ordering = ("username",)